@@ -14,14 +14,25 @@ Author: Luke Gasson
 """
 
 import os
+import asyncio
 import json
 import base64
+import hashlib
+import io
 import logging
+import re
 import time
 import traceback
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
 import boto3
+import orjson
+from botocore.config import Config
 from botocore.exceptions import ClientError
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from PIL import Image, ImageOps
 
 # ---------------------------
 # Runtime configuration
@@ -29,6 +40,29 @@ from openai import OpenAI
 S3_BUCKET = os.environ.get("ASSET_BUCKET", "metrosafetyprod")
 MODEL = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
 LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# Items are independent and almost entirely S3/OpenAI network wait, so they run
+# on a thread pool. Keep this within the OpenAI rate limit for the model.
+MAX_WORKERS = int(os.environ.get("ASSET_MAX_WORKERS", "16"))
+# Gap between starting consecutive OpenAI requests in the first concurrent wave.
+DISPATCH_STAGGER_SECONDS = int(os.environ.get("ASSET_DISPATCH_STAGGER_MS", "20")) / 1000
+# How long a warm container trusts a resolved ContentVersion prefix -> S3 key.
+KEY_CACHE_SECONDS = int(os.environ.get("ASSET_KEY_CACHE_SECONDS", "900"))
+# A ContentVersion prefix holds the upload plus a few derivatives, so one small LIST page covers it.
+PREFIX_LIST_MAX_KEYS = int(os.environ.get("ASSET_PREFIX_LIST_MAX_KEYS", "10"))
+# Photos from the same building are classified together, this many per request.
+BATCH_MAX = int(os.environ.get("ASSET_BATCH_MAX", "4"))
+# Completion budget per photo; a full field set with the cross-sell summary is well under this.
+MAX_TOKENS_PER_IMAGE = int(os.environ.get("ASSET_MAX_TOKENS_PER_IMAGE", "1200"))
+# Optional DynamoDB table sharing finished results between containers.
+RESULT_CACHE_TABLE = os.environ.get("ASSET_CACHE_TABLE", "")
+RESULT_CACHE_SECONDS = int(os.environ.get("ASSET_CACHE_SECONDS", str(30 * 24 * 60 * 60)))
+RESULT_CACHE_MAX_ENTRIES = 1024
+# Batch API submissions keep their prepared items here until they are collected.
+BATCH_RESULTS_PREFIX = os.environ.get("ASSET_BATCH_RESULTS_PREFIX", "asset_categorisation/batches/")
+# Photos are shrunk to fit this box before being inlined; vision cost scales with tiles.
+IMAGE_MAX_EDGE = int(os.environ.get("ASSET_IMAGE_MAX_EDGE", "1024"))
+# "low" sends a single 512px tile per photo; keep "auto" unless condition grading holds up at that size.
+IMAGE_DETAIL = os.environ.get("ASSET_IMAGE_DETAIL", "auto")
 
 logger = logging.getLogger()
 logger.setLevel(LOG_LEVEL)
@@ -44,9 +78,13 @@ def log_event(level: str, message: str, **fields):
     """
     Emit one structured JSON log line for CloudWatch Logs Insights.
     Do not log API keys, presigned URLs, or full image payloads.
+    Lines below LOG_LEVEL are dropped before anything is serialised.
     """
+    levelno = getattr(logging, level.upper(), logging.INFO)
+    if not logger.isEnabledFor(levelno):
+        return
     payload = {"message": message, **fields}
-    logger.log(getattr(logging, level.upper(), logging.INFO), json.dumps(payload, default=str))
+    logger.log(levelno, orjson.dumps(payload, default=str).decode())
 
 def safe_headers(headers: dict | None) -> dict:
     safe = {}
@@ -60,6 +98,7 @@ def safe_headers(headers: dict | None) -> dict:
 def safe_event_summary(event: dict) -> dict:
     """
     Keep the useful request information, but avoid dumping huge/noisy API Gateway payloads.
+    The body is only measured here; parse_incoming parses it once and logs the items.
     """
     if not isinstance(event, dict):
         return {"event_type": type(event).__name__}
@@ -68,23 +107,6 @@ def safe_event_summary(event: dict) -> dict:
     body_summary = {"present": body is not None}
     if body is not None:
         body_summary["length"] = len(body) if isinstance(body, str) else None
-        try:
-            decoded_body = body
-            if event.get("isBase64Encoded") and isinstance(body, str):
-                decoded_body = base64.b64decode(body).decode("utf-8")
-            parsed_body = json.loads(decoded_body) if isinstance(decoded_body, str) else decoded_body
-            if isinstance(parsed_body, list):
-                body_summary["item_count"] = len(parsed_body)
-                body_summary["content_version_ids"] = [
-                    (item or {}).get("ContentVersionId") for item in parsed_body if isinstance(item, dict)
-                ]
-                body_summary["has_building_address"] = [
-                    bool((item or {}).get("BuildingAddress")) for item in parsed_body if isinstance(item, dict)
-                ]
-            else:
-                body_summary["parsed_type"] = type(parsed_body).__name__
-        except Exception as e:
-            body_summary["parse_error"] = str(e)
 
     return {
         "resource": event.get("resource"),
@@ -98,17 +120,34 @@ def safe_event_summary(event: dict) -> dict:
         "isBase64Encoded": event.get("isBase64Encoded"),
     }
 
+def _get_secret_value(arn: str) -> dict:
+    """
+    Read a secret via the Parameters and Secrets Lambda Extension when it is
+    attached (PARAMETERS_SECRETS_EXTENSION_HTTP_PORT set), else Secrets Manager.
+    """
+    port = os.environ.get("PARAMETERS_SECRETS_EXTENSION_HTTP_PORT")
+    if not port:
+        # Short-lived client: it is only needed once per container.
+        return boto3.client("secretsmanager").get_secret_value(SecretId=arn)
+
+    import urllib.request
+    from urllib.parse import quote
+
+    request = urllib.request.Request(
+        f"http://localhost:{port}/secretsmanager/get?secretId={quote(arn, safe='')}",
+        headers={"X-Aws-Parameters-Secrets-Token": os.environ["AWS_SESSION_TOKEN"]},
+    )
+    with urllib.request.urlopen(request, timeout=2) as response:
+        return orjson.loads(response.read())
+
 def _load_openai_key():
     arn = os.environ.get("OPENAI_SECRET_ARN")
     if arn:
-        sm = boto3.client("secretsmanager")
-        val = sm.get_secret_value(SecretId=arn)
+        val = _get_secret_value(arn)
         s = val.get("SecretString")
         return s if s is not None else base64.b64decode(val["SecretBinary"]).decode()
     return os.environ.get("OPENAI_API_KEY")  # local/dev fallback
 
-OPENAI_API_KEY = _load_openai_key()
-
 # ---------------------------
 # Model prompt and output contract
 # ---------------------------
@@ -119,7 +158,7 @@ SYSTEM_PROMPT = (
     "Distinguishing_Features__c, Asset_Condition__c, Broken_Or_Needs_Replacement__c, "
     "Service_Provider_Or_Supplier__c, Other_Codes_Or_Numbers__c, How_To_Test__c, "
     "How_To_Replace__c, Parts_Needed__c, UK_Estimated_Price__c, "
-    "Estimated_Unit_Replacement_Cost__c, Estimated_Replacement_Parts_Price__c,"
+    "Estimated_Unit_Replacement_Cost__c, Estimated_Replacement_Parts_Price__c, "
     "Estimated_Labour_Cost_To_Repair__c, Estimated_Labour_Cost_To_Replace__c, "
     "Estimated_Labour_Cost_To_Repair_On_Site__c, Estimated_Time_To_Replace_On_Site__c, "
     "Object_Type_AI__c, Object_Category_AI__c, Confidence__c, "
@@ -128,14 +167,13 @@ SYSTEM_PROMPT = (
     "Premises_Situation__c, Location_Type__c, Building_Classification__c, "
     "Floor_Construction__c, Building_Height_m__c, Storeys_Above_Ground__c, "
     "Storeys_Below_Ground__c, Approx_Dimensions__c, Roof_Details__c, "
-    "Vehicle_Parking__c, General_Occupancy_Types__c, Fire_History_Summary__c. "
-    "Drive_Distance_km__c, "
-    "Obsequio_cross_sell_long__c"
+    "Vehicle_Parking__c, General_Occupancy_Types__c, Fire_History_Summary__c, "
+    "Drive_Distance_km__c, Obsequio_cross_sell_long__c. "
     "Always provide a best-guess for every field, even if uncertain. If there is none however, respond with N/A. "
     "For Colour__c, return only a SINGLE most dominant or most likely colour (not multiple). "
     "Base your assumptions on typical UK standards and suppliers if the photo does not show enough detail. "
     "Return realistic rough values (e.g., '120mm diameter', '£20-£40', 'Screwdriver needed'). "
-    "Never leave a field blank. Confidence__c must be a number 0..1. "
+    "Never leave a field blank. Confidence__c must be a number 0..1 for your overall certainty. "
 
     "For Object_Type_AI__c, you MUST pick exactly one key from OBJECT_MAP (or 'N/A' if nothing fits). "
     "For Object_Category_AI__c, you MUST pick exactly one allowed subtype for the chosen key; if the key has no subtypes "
@@ -152,23 +190,19 @@ SYSTEM_PROMPT = (
     "Using the building_address and any visible context in the image, also best-guess the high-level "
     "building description fields (Premises_Situation__c, Location_Type__c, Building_Classification__c, "
     "Floor_Construction__c, Building_Height_m__c, Storeys_Above_Ground__c, Storeys_Below_Ground__c, "
-    "Approx_Dimensions__c, Roof_Details__c, Vehicle_Parking__c,  Drive_Distance_km__c,"
+    "Approx_Dimensions__c, Roof_Details__c, Vehicle_Parking__c, Drive_Distance_km__c, "
     "General_Occupancy_Types__c, Fire_History_Summary__c) in the same style as UK fire risk "
-    "assessments"
+    "assessments.\n"
 
-    "For ALL fields, if the information is missing, unclear, or not visible, you MUST provide a realistic"
-    "estimated value or range based on typical UK assets, buildings, construction practices, or dimensions."
-    "Never simply return N/A unless there is absolutely no reasonable inference that can be made."
+    "For ALL fields, if the information is missing, unclear, or not visible, you MUST provide a realistic "
+    "estimated value or range based on typical UK assets, buildings, construction practices, or dimensions. "
+    "Never simply return N/A unless there is absolutely no reasonable inference that can be made.\n"
 
-    "When providing estimates:"
-    "- Use realistic ranges (e.g., “8–12 m”, “20–40 minutes”, “£80–£120”)"
-    "- Include only the final estimated value/range in the JSON (no explanation)"
-    "- Internally reason about building type, age, materials, and UK norms, but do not expose chain-of-thought"
-    "- Ensure the estimate is plausible, concise, and formatted as a usable value"
-    "- If forced to return N/A, do so only when no reasonable inference exists"
-
-    "Confidence__c must be a number between 0 and 1 representing your overall certainty for"
-    "the classification and estimates."
+    "When providing estimates:\n"
+    "- Use realistic ranges (e.g., “8–12 m”, “20–40 minutes”, “£80–£120”)\n"
+    "- Include only the final estimated value/range in the JSON (no explanation)\n"
+    "- Internally reason about building type, age, materials, and UK norms, but do not expose chain-of-thought\n"
+    "- Ensure the estimate is plausible, concise, and formatted as a usable value\n"
 
     "Using publicly available information only, analyse the identified asset and determine which specific "
     "Obsequio Group company or companies could provide installation, replacement, maintenance, servicing, "
@@ -190,18 +224,8 @@ SYSTEM_PROMPT = (
     "- Atlas World – Multi-disciplinary fire, security, energy, and assistive technology solutions "
     "with UK and Ireland presence.\n"
 
-    "Your analysis must include:\n"
-    "1. A clear identification of the asset type.\n"
-    "2. The typical fire, safety, water hygiene, electrical, asbestos, building maintenance, "
-    "or statutory compliance services that this asset usually requires.\n"
-    "3. A mapping of those service needs to the known capabilities of each relevant Obsequio Group company.\n"
-    "4. A clear statement of which companies can most realistically:\n"
-    "   - install the asset\n"
-    "   - maintain or service the asset\n"
-    "   - upgrade or replace the asset\n"
-    "   - monitor the asset remotely\n"
-    "   - provide digital or IoT integration\n"
-    "(Select all companies that reasonably apply based on capability.)\n"
+    "Select every company that can realistically install, maintain, upgrade, replace, remotely monitor "
+    "or digitally integrate this asset.\n"
 
     "For IoT, digital connectivity, or smart monitoring:\n"
     "- Identify whether technology can reasonably be applied to this asset type.\n"
@@ -220,13 +244,91 @@ SYSTEM_PROMPT = (
 
 USER_INSTRUCTION = "Respond ONLY with a compact single JSON object containing all fields listed in the system prompt"
 
+# Every result carries every field, so Salesforce always receives the same shape.
+# Read-only: results are built by copying it ({**RESULT_DEFAULTS, ...}), never by mutating it.
+RESULT_DEFAULTS: Mapping[str, str | float] = MappingProxyType({
+    "Manufacturer_AI__c": "", "What_Is_It__c": "", "SerialNumber": "", "Colour__c": "",
+    "Rough_Dimensions__c": "", "Distinguishing_Features__c": "", "Asset_Condition__c": "",
+    "Broken_Or_Needs_Replacement__c": "", "Service_Provider_Or_Supplier__c": "",
+    "Other_Codes_Or_Numbers__c": "", "How_To_Test__c": "", "How_To_Replace__c": "",
+    "Parts_Needed__c": "", "UK_Estimated_Price__c": "",
+    "Estimated_Unit_Replacement_Cost__c": "",
+    "Estimated_Replacement_Parts_Price__c": "",
+    "Estimated_Labour_Cost_To_Repair__c": "",
+    "Estimated_Labour_Cost_To_Replace__c": "",
+    "Estimated_Labour_Cost_To_Repair_On_Site__c": "",
+    "Estimated_Time_To_Replace_On_Site__c": "",
+    "Object_Type_AI__c": "",
+    "Object_Category_AI__c": "",
+    "Confidence__c": 0.0,
+    "Nearest_Store_Name__c": "",
+    "Nearest_Store_Address__c": "",
+    "Drive_Time__c": "",
+    "Price_Including_Drive_Time__c": "",
+    "Opening_Hours__c": "",
+    "Premises_Situation__c": "",
+    "Location_Type__c": "",
+    "Building_Classification__c": "",
+    "Floor_Construction__c": "",
+    "Building_Height_m__c": "",
+    "Storeys_Above_Ground__c": "",
+    "Storeys_Below_Ground__c": "",
+    "Approx_Dimensions__c": "",
+    "Roof_Details__c": "",
+    "Vehicle_Parking__c": "",
+    "General_Occupancy_Types__c": "",
+    "Fire_History_Summary__c": "",
+    "Obsequio_cross_sell_long__c": "",
+    "Drive_Distance_km__c": "",
+})
+
 # ---------------------------
 # AWS and OpenAI clients
 # ---------------------------
-s3 = boto3.client("s3")
-oai = OpenAI(api_key=OPENAI_API_KEY)
+# boto3 clients are thread-safe; size the pool so every worker gets a connection
+# and keep idle connections alive so warm invocations skip the TLS handshake.
+AWS_CLIENT_CONFIG = Config(
+    retries={"max_attempts": 3, "mode": "adaptive"},
+    tcp_keepalive=True,
+    max_pool_connections=MAX_WORKERS * 2,
+)
+s3 = boto3.client("s3", config=AWS_CLIENT_CONFIG)
+# The result cache client is built on first use; the low-level client avoids
+# loading the resource layer at cold start.
+_dynamodb = None
+
+def get_dynamodb_client():
+    global _dynamodb
+    if _dynamodb is None:
+        _dynamodb = boto3.client("dynamodb", config=AWS_CLIENT_CONFIG)
+    return _dynamodb
+
+# The OpenAI key is fetched on first use rather than at import, so the cold
+# start does not wait on Secrets Manager; the client is then reused while warm.
+_oai = None
+# Pooled async connections are bound to the loop that opened them, so keep a
+# single loop for the container rather than asyncio.run() per invocation.
+event_loop = asyncio.new_event_loop()
+
+def get_openai_client() -> AsyncOpenAI:
+    global _oai
+    if _oai is None:
+        _oai = AsyncOpenAI(
+            api_key=_load_openai_key(),
+            # One pooled client for the container, sized above the in-flight cap so
+            # warm invocations reuse open TLS connections instead of re-handshaking.
+            http_client=DefaultAsyncHttpxClient(
+                timeout=httpx.Timeout(60.0, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=64,
+                    max_keepalive_connections=32,
+                    keepalive_expiry=300,
+                ),
+            ),
+        )
+    return _oai
 
-OBJECT_MAP: dict[str, list[str]] = {
+OBJECT_MAP: Mapping[str, tuple[str, ...]] = {
   "Access": [],
   "Activation Point": ["Button (Test)", "Check LED", "Distribution Board", "Fish Key", "Fish Key (Own)", "Fish Key (Single Tooth)", "Fish Key (Thin)", "Fish Key Bank", "Fish Key Switch", "Flick Fuse", "Flick Switch", "Fuse (Ceramic)", "Fuse (Pull)", "Key (Flat)", "Switch (Push)", "Switch (Rocker)", "Switch (Test)", "Testing Panel", "Unlisted"],
   "Alarm Gong": [],
@@ -399,6 +501,20 @@ OBJECT_MAP: dict[str, list[str]] = {
   "Zone Map": []
 }
 
+# Serialised once per container; orjson's compact output also trims prompt tokens.
+OBJECT_MAP_JSON = orjson.dumps(OBJECT_MAP).decode()
+# Freeze the taxonomy: warm invocations share it, so nothing may mutate it.
+OBJECT_MAP = MappingProxyType({key: tuple(subtypes) for key, subtypes in OBJECT_MAP.items()})
+OBJECT_SUBTYPES = {key: frozenset(subtypes) for key, subtypes in OBJECT_MAP.items()}
+
+# Everything that is identical for every photo goes in the system message, so
+# requests share one long prefix that OpenAI can serve from its prompt cache.
+SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": f"{SYSTEM_PROMPT}\n{USER_INSTRUCTION}.\nOBJECT_MAP (allowed values): {OBJECT_MAP_JSON}",
+}
+PROMPT_CACHE_KEY = "asset_categorisation-" + hashlib.sha256(SYSTEM_MESSAGE["content"].encode("utf-8")).hexdigest()[:16]
+
 # ---------------------------
 # Helper functions
 # ---------------------------
@@ -409,6 +525,10 @@ def is_blurred_derivative(key: str) -> bool:
     return stem.endswith("_blurred")
 
 
+# prefix -> (s3 key, etag, expiry epoch seconds); lives for the warm container.
+_key_cache: dict[str, tuple[str, str, float]] = {}
+
+
 def find_key_by_prefix(prefix: str) -> str | None:
     """
     Return the newest original S3 key whose name starts with the given prefix.
@@ -416,28 +536,39 @@ def find_key_by_prefix(prefix: str) -> str | None:
     Privacy-processing derivatives such as `photo_blurred.jpg` deliberately
     share the ContentVersion prefix, so they must not participate in the
     newest-object comparison.
+
+    A ContentVersionId identifies a single uploaded file version, so usually
+    only one small LIST page (PREFIX_LIST_MAX_KEYS) is needed; a truncated
+    page is followed with the paginator. Hits are cached for KEY_CACHE_SECONDS.
     """
+    cached = _key_cache.get(prefix)
+    if cached and cached[2] > time.time():
+        log_event("INFO", "s3_lookup_cache_hit", bucket=S3_BUCKET, prefix=prefix, latest_key=cached[0])
+        return cached[0]
+
     started = time.time()
     log_event("INFO", "s3_lookup_started", bucket=S3_BUCKET, prefix=prefix)
     try:
-        paginator = s3.get_paginator("list_objects_v2")
-        latest_key, latest_ts = None, 0.0
-        page_count = 0
-        object_count = 0
-        blurred_object_count = 0
-
-        for page in paginator.paginate(Bucket=S3_BUCKET, Prefix=prefix):
-            page_count += 1
-            contents = page.get("Contents", [])
-            object_count += len(contents)
-            for obj in contents:
-                if is_blurred_derivative(obj["Key"]):
-                    blurred_object_count += 1
-                    continue
-                ts = obj["LastModified"].timestamp()
-                if ts > latest_ts:
-                    latest_ts = ts
-                    latest_key = obj["Key"]
+        page = s3.list_objects_v2(Bucket=S3_BUCKET, Prefix=prefix, MaxKeys=PREFIX_LIST_MAX_KEYS)
+        contents = page.get("Contents", [])
+        truncated = bool(page.get("IsTruncated"))
+        if truncated:
+            # Unusually many objects share this prefix; list the rest so the newest isn't missed.
+            paginator = s3.get_paginator("list_objects_v2")
+            for rest in paginator.paginate(
+                Bucket=S3_BUCKET,
+                Prefix=prefix,
+                PaginationConfig={"StartingToken": page["NextContinuationToken"]},
+            ):
+                contents.extend(rest.get("Contents", []))
+        originals = [obj for obj in contents if not is_blurred_derivative(obj["Key"])]
+        # LastModified datetimes compare directly; no per-object timestamp() needed.
+        latest = max(originals, key=lambda obj: obj["LastModified"], default=None)
+        latest_key = latest["Key"] if latest else None
+
+        # Misses are not cached: the photo may simply not have landed in S3 yet.
+        if latest_key:
+            _key_cache[prefix] = (latest_key, latest["ETag"], time.time() + KEY_CACHE_SECONDS)
 
         log_event(
             "INFO",
@@ -446,9 +577,9 @@ def find_key_by_prefix(prefix: str) -> str | None:
             prefix=prefix,
             found=bool(latest_key),
             latest_key=latest_key,
-            pages_scanned=page_count,
-            objects_matched=object_count,
-            blurred_objects_ignored=blurred_object_count,
+            truncated=truncated,
+            objects_matched=len(contents),
+            blurred_objects_ignored=len(contents) - len(originals),
             duration_ms=round((time.time() - started) * 1000, 2),
         )
         return latest_key
@@ -464,23 +595,45 @@ def find_key_by_prefix(prefix: str) -> str | None:
         )
         return None
 
-def presign(key: str, seconds: int = 900) -> str:
+def cached_etag(prefix: str) -> str | None:
+    """ETag of the object find_key_by_prefix last resolved for this prefix."""
+    cached = _key_cache.get(prefix)
+    return cached[1] if cached else None
+
+def image_data_url(key: str) -> str:
+    """
+    Download the photo, downscale it to IMAGE_MAX_EDGE and inline it as a JPEG
+    data URL, so OpenAI neither fetches the full-size original nor tiles it.
+    Raises ValueError when Pillow cannot decode the object: OpenAI only accepts
+    formats Pillow reads, so there is nothing useful to send instead.
+    """
     started = time.time()
-    url = s3.generate_presigned_url(
-        ClientMethod="get_object",
-        Params={"Bucket": S3_BUCKET, "Key": key},
-        ExpiresIn=seconds,
-    )
+    raw = s3.get_object(Bucket=S3_BUCKET, Key=key)["Body"].read()
+    try:
+        with Image.open(io.BytesIO(raw)) as img:
+            # JPEGs decode straight to a reduced scale, keeping concurrent items within Lambda memory.
+            img.draft("RGB", (IMAGE_MAX_EDGE, IMAGE_MAX_EDGE))
+            img = ImageOps.exif_transpose(img)
+            original_size = img.size
+            img.thumbnail((IMAGE_MAX_EDGE, IMAGE_MAX_EDGE), Image.LANCZOS)
+            buf = io.BytesIO()
+            img.convert("RGB").save(buf, "JPEG", quality=85, optimize=True)
+    except OSError as e:
+        log_event("WARNING", "image_inline_failed", bucket=S3_BUCKET, key=key, error_message=str(e))
+        raise ValueError(f"Unsupported image '{key}': {e}") from e
+
+    data_url = "data:image/jpeg;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
     log_event(
         "INFO",
-        "s3_presign_created",
+        "image_inlined",
         bucket=S3_BUCKET,
         key=key,
-        expires_in_seconds=seconds,
-        url_length=len(url),
+        original_bytes=len(raw),
+        original_size=original_size,
+        inlined_bytes=buf.tell(),
         duration_ms=round((time.time() - started) * 1000, 2),
     )
-    return url
+    return data_url
 
 # EXACT picklist values from Salesforce (API values must match these)
 ASSET_CONDITION_VALUES = [
@@ -492,67 +645,130 @@ ASSET_CONDITION_VALUES = [
     "C5 - Asset Unserviceable",
 ]
 
-def normalize_asset_condition(text: str) -> str:
-    t = (text or "").strip().lower()
-
+# Keyword rules in priority order: the first class with any matching phrase wins.
+ASSET_CONDITION_RULES = [
     # C5 — clearly broken/unsafe
-    if any(w in t for w in ["unserviceable", "not working", "doesn't work", "broken", "inoperative", "unsafe", "failed"]):
-        return "C5 - Asset Unserviceable"
-
+    (["unserviceable", "not working", "doesn't work", "broken", "inoperative", "unsafe", "failed"],
+     "C5 - Asset Unserviceable"),
     # C4 — needs replacement / end-of-life
-    if any(w in t for w in ["requires renewal", "replace", "replacement", "end of life", "obsolete", "beyond repair", "major defect"]):
-        return "C4 - Requires renewal"
-
+    (["requires renewal", "replace", "replacement", "end of life", "obsolete", "beyond repair", "major defect"],
+     "C4 - Requires renewal"),
     # C3 — needs maintenance/repair to return to service
-    if any(w in t for w in ["maintenance required", "requires maintenance", "repair", "service", "intermittent fault", "faulty"]):
-        return "C3 - Maintenance required to return to an accepted level of service"
-
+    (["maintenance required", "requires maintenance", "repair", "service", "intermittent fault", "faulty"],
+     "C3 - Maintenance required to return to an accepted level of service"),
     # C2 (clean) — mainly dirty
-    if any(w in t for w in ["dirty", "dust", "grime", "cleaning", "needs cleaning"]):
-        return "C2 - Needs cleaning"
-
+    (["dirty", "dust", "grime", "cleaning", "needs cleaning"],
+     "C2 - Needs cleaning"),
     # C2 (minor defects) — scuffs/scratches/loose etc.
-    if any(w in t for w in ["minor defect", "minor defects", "scuff", "scratch", "crack", "loose", "wear", "worn", "cosmetic", "slight"]):
-        return "C2 - Minor Defects Only"
-
+    (["minor defect", "minor defects", "scuff", "scratch", "crack", "loose", "wear", "worn", "cosmetic", "slight"],
+     "C2 - Minor Defects Only"),
     # C1 — good/very good/serviceable
-    if any(w in t for w in ["very good", "excellent", "good", "serviceable", "ok", "works", "working"]):
-        return "C1 - Very Good Condition"
+    (["very good", "excellent", "good", "serviceable", "ok", "works", "working"],
+     "C1 - Very Good Condition"),
+]
+# One case-insensitive alternation per class replaces a substring scan per phrase.
+ASSET_CONDITION_PATTERNS = [
+    (re.compile("|".join(re.escape(w) for w in words), re.IGNORECASE), value)
+    for words, value in ASSET_CONDITION_RULES
+]
+
+def normalize_asset_condition(text: str) -> str:
+    if text in ASSET_CONDITION_VALUES:
+        return text
+    t = text or ""
+    for pattern, value in ASSET_CONDITION_PATTERNS:
+        if pattern.search(t):
+            return value
 
     # Fallback: choose a safe middle ground if the model is vague
     return "C2 - Minor Defects Only"
 
-def call_openai(image_url: str, building_address: str) -> dict:
+def loads_model_json(text: str):
+    """orjson first; stdlib json only for the NaN/Infinity literals orjson rejects."""
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return json.loads(text)
+
+# Strict structured output: every field is required and the picklists are
+# enforced by the API, so replies always parse and use exact Salesforce values.
+ASSET_SCHEMA = {
+    "type": "object",
+    "properties": {
+        key: {"type": "number" if isinstance(default, float) else "string"}
+        for key, default in RESULT_DEFAULTS.items()
+    },
+    "required": list(RESULT_DEFAULTS),
+    "additionalProperties": False,
+}
+ASSET_SCHEMA["properties"]["Asset_Condition__c"]["enum"] = ASSET_CONDITION_VALUES
+ASSET_SCHEMA["properties"]["Object_Type_AI__c"]["enum"] = [*OBJECT_MAP, "N/A"]
+ASSET_SCHEMA["properties"]["Object_Category_AI__c"]["enum"] = [
+    *sorted({subtype for subtypes in OBJECT_MAP.values() for subtype in subtypes}),
+    "N/A",
+]
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "asset", "schema": ASSET_SCHEMA, "strict": True},
+}
+BATCH_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "asset_batch",
+        "schema": {
+            "type": "object",
+            "properties": {"results": {"type": "array", "items": ASSET_SCHEMA}},
+            "required": ["results"],
+            "additionalProperties": False,
+        },
+        "strict": True,
+    },
+}
+
+def chat_request(user_content: list, image_count: int, response_format: dict) -> dict:
+    """Chat completion parameters shared by inline calls and Batch API request lines."""
+    return {
+        "model": MODEL,
+        "messages": [
+            SYSTEM_MESSAGE,
+            {"role": "user", "content": user_content},
+        ],
+        # Deterministic extraction: repeat requests give the same answer and
+        # a capped budget stops a runaway completion holding the Lambda open.
+        "temperature": 0,
+        "seed": 42,
+        "n": 1,
+        "max_completion_tokens": MAX_TOKENS_PER_IMAGE * image_count,
+        "prompt_cache_key": PROMPT_CACHE_KEY,
+        "response_format": response_format,
+    }
+
+async def _chat(user_content: list, image_count: int, response_format: dict) -> str:
+    """Send one chat completion with the shared system prefix and return its JSON text."""
     started = time.time()
     log_event(
         "INFO",
         "openai_request_started",
         model=MODEL,
-        has_api_key=bool(OPENAI_API_KEY),
-        has_building_address=bool(building_address),
+        image_count=image_count,
         object_map_keys=len(OBJECT_MAP),
     )
 
-    resp = oai.chat.completions.create(
-        model=MODEL,
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": [
-                {"type": "text", "text": USER_INSTRUCTION},
-                {"type": "text", "text": f"Building address: {building_address}"},
-                {"type": "text", "text": "OBJECT_MAP (allowed values): " + json.dumps(OBJECT_MAP)},
-                {"type": "image_url", "image_url": {"url": image_url}},
-            ]}
-        ],
-        temperature=0.2,
+    resp = await get_openai_client().chat.completions.create(
+        **chat_request(user_content, image_count, response_format)
     )
-    text = resp.choices[0].message.content.strip()
+    message = resp.choices[0].message
+    if getattr(message, "refusal", None):
+        raise ValueError(f"Model refused: {message.refusal}")
+    text = message.content or ""
 
     usage = getattr(resp, "usage", None)
     log_event(
         "INFO",
         "openai_response_received",
         model=MODEL,
+        image_count=image_count,
         response_id=getattr(resp, "id", None),
         finish_reason=getattr(resp.choices[0], "finish_reason", None),
         response_chars=len(text),
@@ -562,72 +778,28 @@ def call_openai(image_url: str, building_address: str) -> dict:
         duration_ms=round((time.time() - started) * 1000, 2),
     )
 
-    # Strip common code fences
-    if text.startswith("```"):
-        parts = text.split("```")
-        text = parts[1] if len(parts) > 1 else text
-    if text.lower().startswith("json"):
-        text = text[4:].strip()
+    return text
 
-    try:
-        data = json.loads(text)
-        data["Asset_Condition__c"] = normalize_asset_condition(data.get("Asset_Condition__c"))
-        log_event(
-            "INFO",
-            "openai_json_parsed",
-            returned_keys=len(data),
-            object_type=data.get("Object_Type_AI__c"),
-            object_category=data.get("Object_Category_AI__c"),
-            confidence=data.get("Confidence__c"),
-        )
-    except Exception as e:
-        log_event(
-            "ERROR",
-            "openai_json_parse_failed",
-            error_message=str(e),
-            raw_response_excerpt=text[:1000],
-        )
-        data = {"_raw_response": text}
+def finalise_fields(data: dict) -> dict:
+    """
+    Normalise the condition picklist, drop a category that does not belong to the
+    chosen object type, fill missing keys and coerce Confidence__c.
+    """
+    data["Asset_Condition__c"] = normalize_asset_condition(data.get("Asset_Condition__c"))
+    category = data.get("Object_Category_AI__c")
+    if category and category != "N/A" and category not in OBJECT_SUBTYPES.get(data.get("Object_Type_AI__c"), ()):
+        data["Object_Category_AI__c"] = "N/A"
+    log_event(
+        "INFO",
+        "openai_json_parsed",
+        returned_keys=len(data),
+        object_type=data.get("Object_Type_AI__c"),
+        object_category=data.get("Object_Category_AI__c"),
+        confidence=data.get("Confidence__c"),
+    )
 
     # Ensure all keys present; coerce Confidence__c
-    defaults = {
-        "Manufacturer_AI__c": "", "What_Is_It__c": "", "SerialNumber": "", "Colour__c": "",
-        "Rough_Dimensions__c": "", "Distinguishing_Features__c": "", "Asset_Condition__c": "",
-        "Broken_Or_Needs_Replacement__c": "", "Service_Provider_Or_Supplier__c": "",
-        "Other_Codes_Or_Numbers__c": "", "How_To_Test__c": "", "How_To_Replace__c": "",
-        "Parts_Needed__c": "", "UK_Estimated_Price__c": "",
-        "Estimated_Unit_Replacement_Cost__c": "",
-        "Estimated_Replacement_Parts_Price__c": "",
-        "Estimated_Labour_Cost_To_Repair__c": "",
-        "Estimated_Labour_Cost_To_Replace__c": "",
-        "Estimated_Labour_Cost_To_Repair_On_Site__c": "",
-        "Estimated_Time_To_Replace_On_Site__c": "",
-        "Object_Type_AI__c": "",
-        "Object_Category_AI__c": "",
-        "Confidence__c": 0.0,
-        "Nearest_Store_Name__c": "",
-        "Nearest_Store_Address__c": "",
-        "Drive_Time__c": "",
-        "Price_Including_Drive_Time__c": "",
-        "Opening_Hours__c": "",
-        "Premises_Situation__c": "",
-        "Location_Type__c": "",
-        "Building_Classification__c": "",
-        "Floor_Construction__c": "",
-        "Building_Height_m__c": "",
-        "Storeys_Above_Ground__c": "",
-        "Storeys_Below_Ground__c": "",
-        "Approx_Dimensions__c": "",
-        "Roof_Details__c": "",
-        "Vehicle_Parking__c": "",
-        "General_Occupancy_Types__c": "",
-        "Fire_History_Summary__c": "",
-
-        "Obsequio_cross_sell_long__c": "",
-        "Drive_Distance_km__c": "",
-    }
-    for k, v in defaults.items():
-        data.setdefault(k, v)
+    data = {**RESULT_DEFAULTS, **data}
     try:
         data["Confidence__c"] = float(data.get("Confidence__c", 0.0))
     except Exception:
@@ -635,53 +807,59 @@ def call_openai(image_url: str, building_address: str) -> dict:
 
     return data
 
+def single_user_content(image_url: str, building_address: str) -> list:
+    return [
+        {"type": "text", "text": f"Building address: {building_address}"},
+        {"type": "image_url", "image_url": {"url": image_url, "detail": IMAGE_DETAIL}},
+    ]
+
+async def call_openai(image_url: str, building_address: str) -> dict:
+    text = await _chat(
+        single_user_content(image_url, building_address),
+        image_count=1,
+        response_format=RESPONSE_FORMAT,
+    )
+    return finalise_fields(loads_model_json(text))
+
+async def call_openai_batch(image_urls: list[str], building_address: str) -> list[dict]:
+    """
+    Classify several photos from the same building in one request, so the shared
+    prompt and address are paid for once. Raises ValueError unless the reply holds
+    exactly one object per photo; callers then fall back to call_openai.
+    """
+    content = [{"type": "text", "text": f"Building address: {building_address}"}]
+    for number, image_url in enumerate(image_urls, start=1):
+        content.append({"type": "text", "text": f"Image {number}:"})
+        content.append({"type": "image_url", "image_url": {"url": image_url, "detail": IMAGE_DETAIL}})
+    content.append({
+        "type": "text",
+        "text": (
+            f"Each of the {len(image_urls)} images is a separate asset. Classify each independently and "
+            'respond with a single JSON object {"results": [...]} holding exactly one object per image, '
+            "in image order, each containing all fields listed in the system prompt."
+        ),
+    })
+
+    text = await _chat(content, image_count=len(image_urls), response_format=BATCH_RESPONSE_FORMAT)
+    data = loads_model_json(text)
+    results = data.get("results") if isinstance(data, dict) else data
+    if not isinstance(results, list) or len(results) != len(image_urls) \
+            or not all(isinstance(r, dict) for r in results):
+        raise ValueError(f"Expected {len(image_urls)} results in batched response")
+    return [finalise_fields(r) for r in results]
+
 def make_error_result(msg: str) -> dict:
     """
     Produce a result object with all expected fields empty so list alignment is preserved.
     """
-    base = {
-        "Manufacturer_AI__c": "", "What_Is_It__c": "", "SerialNumber": "", "Colour__c": "",
-        "Rough_Dimensions__c": "", "Distinguishing_Features__c": "", "Asset_Condition__c": "",
-        "Broken_Or_Needs_Replacement__c": "", "Service_Provider_Or_Supplier__c": "",
-        "Other_Codes_Or_Numbers__c": "", "How_To_Test__c": "", "How_To_Replace__c": "",
-        "Parts_Needed__c": "", "UK_Estimated_Price__c": "", 
-        "Estimated_Unit_Replacement_Cost__c": "",
-        "Estimated_Replacement_Parts_Price__c": "",
-        "Estimated_Labour_Cost_To_Repair__c": "",
-        "Estimated_Labour_Cost_To_Replace__c": "",
-        "Estimated_Labour_Cost_To_Repair_On_Site__c": "",
-        "Estimated_Time_To_Replace_On_Site__c": "",
-        "Object_Type_AI__c": "",
-        "Object_Category_AI__c": "",
-        "Confidence__c": 0.0,
-        "Nearest_Store_Name__c": "",
-        "Nearest_Store_Address__c": "",
-        "Drive_Time__c": "",
-        "Price_Including_Drive_Time__c": "",
-        "Opening_Hours__c": "",
-        "Premises_Situation__c": "",
-        "Location_Type__c": "",
-        "Building_Classification__c": "",
-        "Floor_Construction__c": "",
-        "Building_Height_m__c": "",
-        "Storeys_Above_Ground__c": "",
-        "Storeys_Below_Ground__c": "",
-        "Approx_Dimensions__c": "",
-        "Roof_Details__c": "",
-        "Vehicle_Parking__c": "",
-        "General_Occupancy_Types__c": "",
-        "Fire_History_Summary__c": "",
-
-        "Obsequio_cross_sell_long__c": "",
-        "Drive_Distance_km__c": "",
-        "_error": msg
-    }
-    return base
+    return {**RESULT_DEFAULTS, "_error": msg}
 
 def parse_incoming(event):
     """
     Support both direct array (Lambda test) and API Gateway proxy (event['body']).
     Expect: [{ "ContentVersionId": "<prefix>" }, ...]
+    Backfills instead send {"mode": "batch", "items": [...]} and later
+    {"mode": "batch_status", "batchId": "<id>"}; those objects are returned as-is.
     """
     payload = event
     log_event("INFO", "parse_started", event_type=type(event).__name__)
@@ -696,11 +874,22 @@ def parse_incoming(event):
         )
         if event.get("isBase64Encoded"):
             body = base64.b64decode(body).decode("utf-8")
-        payload = json.loads(body)
+        payload = orjson.loads(body)
 
     if isinstance(payload, str):
         log_event("INFO", "string_payload_detected", payload_length=len(payload))
-        payload = json.loads(payload)
+        payload = orjson.loads(payload)
+
+    if isinstance(payload, dict) and payload.get("mode") == "batch":
+        if not isinstance(payload.get("items"), list):
+            raise ValueError("'items' must be a JSON array in batch mode.")
+        log_event("INFO", "parse_finished", mode="batch", item_count=len(payload["items"]))
+        return payload
+    if isinstance(payload, dict) and payload.get("mode") == "batch_status":
+        if not payload.get("batchId"):
+            raise ValueError("'batchId' is required for batch_status.")
+        log_event("INFO", "parse_finished", mode="batch_status", batch_id=payload["batchId"])
+        return payload
 
     if not isinstance(payload, list):
         raise ValueError("Payload must be a JSON array.")
@@ -710,12 +899,361 @@ def parse_incoming(event):
         "parse_finished",
         item_count=len(payload),
         content_version_ids=[(item or {}).get("ContentVersionId") for item in payload if isinstance(item, dict)],
+        has_building_address=[bool((item or {}).get("BuildingAddress")) for item in payload if isinstance(item, dict)],
     )
     return payload
 
+# cache key -> finished fields; a warm-container layer in front of RESULT_CACHE_TABLE.
+_result_cache: dict[str, dict] = {}
+
+def result_cache_key(etag: str, building_address: str | None) -> str:
+    """The same photo bytes, address, model and prompt give the same answer at temperature 0."""
+    return f"{MODEL}:{PROMPT_CACHE_KEY}:{etag.strip('"')}:{building_address or ''}"
+
+def result_cache_get(cache_key: str) -> dict | None:
+    fields = _result_cache.get(cache_key)
+    if fields is not None or not RESULT_CACHE_TABLE:
+        return fields
+    try:
+        item = get_dynamodb_client().get_item(
+            TableName=RESULT_CACHE_TABLE, Key={"cacheKey": {"S": cache_key}}
+        ).get("Item")
+    except ClientError as e:
+        log_event("WARNING", "result_cache_lookup_failed", error_message=str(e))
+        return None
+    if not item or int(item.get("expiresAt", {}).get("N", 0)) < time.time():
+        return None
+    fields = orjson.loads(item["fields"]["S"])
+    _result_cache[cache_key] = fields
+    return fields
+
+def result_cache_put(cache_key: str, fields: dict):
+    if len(_result_cache) >= RESULT_CACHE_MAX_ENTRIES:
+        _result_cache.clear()
+    _result_cache[cache_key] = fields
+    if not RESULT_CACHE_TABLE:
+        return
+    try:
+        get_dynamodb_client().put_item(
+            TableName=RESULT_CACHE_TABLE,
+            Item={
+                "cacheKey": {"S": cache_key},
+                # Stored as JSON text so floats do not need Decimal conversion.
+                "fields": {"S": orjson.dumps(fields).decode()},
+                "expiresAt": {"N": str(int(time.time()) + RESULT_CACHE_SECONDS)},
+            },
+        )
+    except ClientError as e:
+        log_event("WARNING", "result_cache_write_failed", error_message=str(e))
+
+def prepare_item(index: int, item: dict, aws_request_id: str | None) -> dict:
+    """
+    Resolve and inline one request item's photo. Never raises: failures are
+    returned as a finished "result" so index alignment is preserved.
+    """
+    prefix = (item or {}).get("ContentVersionId")
+    building_address = (item or {}).get("BuildingAddress")
+    prepared = {
+        "index": index,
+        "prefix": prefix,
+        "building_address": building_address,
+        "started": time.time(),
+    }
+
+    log_event(
+        "INFO",
+        "item_processing_started",
+        aws_request_id=aws_request_id,
+        index=index,
+        prefix=prefix,
+        has_building_address=bool(building_address),
+    )
+
+    if not prefix:
+        msg = "Missing ContentVersionId"
+        log_event("ERROR", "item_failed", aws_request_id=aws_request_id, index=index, error_message=msg)
+        prepared["result"] = make_error_result(msg)
+        return prepared
+
+    key = find_key_by_prefix(prefix)
+    if not key:
+        msg = f"No S3 object for prefix '{prefix}'"
+        log_event("ERROR", "item_failed", aws_request_id=aws_request_id, index=index, prefix=prefix, error_message=msg)
+        prepared["result"] = make_error_result(msg)
+        return prepared
+
+    prepared["s3_key"] = key
+    etag = cached_etag(prefix)
+    if etag:
+        cache_key = result_cache_key(etag, building_address)
+        cached = result_cache_get(cache_key)
+        if cached is not None:
+            log_event("INFO", "result_cache_hit", aws_request_id=aws_request_id, index=index, prefix=prefix)
+            finish_item(prepared, dict(cached), aws_request_id)
+            return prepared
+        prepared["cache_key"] = cache_key
+
+    try:
+        prepared["image_url"] = image_data_url(key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "NoSuchKey":
+            # The cached key was deleted or replaced; make the next lookup re-list.
+            _key_cache.pop(prefix, None)
+        fail_item(prepared, f"Inference failed: {e}", aws_request_id)
+    except Exception as e:
+        fail_item(prepared, f"Inference failed: {e}", aws_request_id)
+    return prepared
+
+def fail_item(prepared: dict, msg: str, aws_request_id: str | None):
+    log_event(
+        "ERROR",
+        "item_failed",
+        aws_request_id=aws_request_id,
+        index=prepared["index"],
+        prefix=prepared["prefix"],
+        s3_key=prepared.get("s3_key"),
+        error_message=msg,
+        traceback=traceback.format_exc(),
+        duration_ms=round((time.time() - prepared["started"]) * 1000, 2),
+    )
+    prepared["result"] = make_error_result(msg)
+
+def finish_item(prepared: dict, fields: dict, aws_request_id: str | None):
+    log_event(
+        "INFO",
+        "item_processing_finished",
+        aws_request_id=aws_request_id,
+        index=prepared["index"],
+        prefix=prepared["prefix"],
+        s3_key=prepared.get("s3_key"),
+        object_type=fields.get("Object_Type_AI__c"),
+        object_category=fields.get("Object_Category_AI__c"),
+        confidence=fields.get("Confidence__c"),
+        has_error="_error" in fields,
+        duration_ms=round((time.time() - prepared["started"]) * 1000, 2),
+    )
+    prepared["result"] = fields
+    if "cache_key" in prepared and "_error" not in fields:
+        result_cache_put(prepared["cache_key"], fields)
+
+def group_for_inference(prepared_items: list[dict]) -> list[list[dict]]:
+    """
+    Group items awaiting inference by BuildingAddress, at most BATCH_MAX per
+    group. Items without an address are classified on their own.
+    """
+    groups = []
+    by_address = {}
+    for prepared in prepared_items:
+        if "result" in prepared:
+            continue
+        address = prepared["building_address"]
+        if not address:
+            groups.append([prepared])
+            continue
+        group = by_address.get(address)
+        if group is None or len(group) >= BATCH_MAX:
+            group = by_address[address] = []
+            groups.append(group)
+        group.append(prepared)
+    return groups
+
+async def classify_group(group: list[dict], aws_request_id: str | None):
+    """Classify a group in one request, falling back to one request per photo."""
+    if len(group) > 1:
+        try:
+            fields_list = await call_openai_batch([p["image_url"] for p in group], group[0]["building_address"])
+            for prepared, fields in zip(group, fields_list):
+                finish_item(prepared, fields, aws_request_id)
+            return
+        except Exception as e:
+            log_event(
+                "WARNING",
+                "batch_inference_fallback",
+                aws_request_id=aws_request_id,
+                indexes=[p["index"] for p in group],
+                error_message=str(e),
+            )
+
+    for prepared in group:
+        try:
+            finish_item(prepared, await call_openai(prepared["image_url"], prepared["building_address"]), aws_request_id)
+        except Exception as e:
+            fail_item(prepared, f"Inference failed: {e}", aws_request_id)
+
+async def classify_groups(groups: list[list[dict]], aws_request_id: str | None):
+    """Run every group's OpenAI calls concurrently, at most MAX_WORKERS in flight."""
+    semaphore = asyncio.Semaphore(MAX_WORKERS)
+
+    async def run(index, group):
+        # Spread the first wave out so requests don't hit OpenAI's rate window in one burst;
+        # later groups are already paced by the semaphore.
+        if index and DISPATCH_STAGGER_SECONDS:
+            await asyncio.sleep(min(index, MAX_WORKERS) * DISPATCH_STAGGER_SECONDS)
+        async with semaphore:
+            await classify_group(group, aws_request_id)
+
+    # return_exceptions keeps one failed group from cancelling its siblings;
+    # anything a group left unfinished becomes an error result in place.
+    outcomes = await asyncio.gather(*(run(i, group) for i, group in enumerate(groups)), return_exceptions=True)
+    for group, outcome in zip(groups, outcomes):
+        if isinstance(outcome, BaseException):
+            for prepared in group:
+                if "result" not in prepared:
+                    fail_item(prepared, f"Inference failed: {outcome}", aws_request_id)
+
 # ---------------------------
 # Lambda entry point
 # ---------------------------
+def dedupe_items(items: list) -> tuple[list, list[int]]:
+    """
+    Collapse repeats of the same photo and address, which Apex retries resend,
+    so each is downloaded and classified once. Returns the unique items and,
+    for every request item, the position of its unique copy.
+    """
+    unique_items = []
+    seen: dict[tuple, int] = {}
+    positions = []
+    for item in items:
+        key = ((item or {}).get("ContentVersionId"), (item or {}).get("BuildingAddress"))
+        if key not in seen:
+            seen[key] = len(unique_items)
+            unique_items.append(item)
+        positions.append(seen[key])
+    return unique_items, positions
+
+def prepare_items(items: list, aws_request_id: str | None) -> list[dict]:
+    # S3 lookups and Pillow resizing are blocking, so they stay on a thread pool;
+    # the OpenAI calls are network-only and fan out on the event loop instead.
+    workers = max(1, min(len(items), MAX_WORKERS))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # List each distinct prefix once, all concurrently; prepare_item then
+        # resolves from the warm key cache even when Apex repeats an item.
+        prefixes = {(item or {}).get("ContentVersionId") for item in items} - {None, ""}
+        list(executor.map(find_key_by_prefix, prefixes))
+        # map() yields in submission order, keeping results aligned with the request.
+        return list(executor.map(prepare_item, range(len(items)), items, [aws_request_id] * len(items)))
+
+def batch_request_line(prepared: dict) -> bytes:
+    body = chat_request(
+        single_user_content(prepared["image_url"], prepared["building_address"]),
+        image_count=1,
+        response_format=RESPONSE_FORMAT,
+    )
+    return orjson.dumps(
+        {
+            "custom_id": str(prepared["index"]),
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": body,
+        }
+    )
+
+def submit_batch(items: list, aws_request_id: str | None) -> dict:
+    """
+    Queue a backfill with the OpenAI Batch API instead of classifying inline.
+
+    Photos are resolved, cache-checked and inlined now, one request line per
+    photo, since the 24 hour completion window outlives any S3 access we
+    could hand to OpenAI. The prepared items (minus image data) are kept in S3
+    so collect_batch can return results in request order.
+    """
+    prepared_items = prepare_items(items, aws_request_id)
+    pending = [prepared for prepared in prepared_items if "result" not in prepared]
+    if not pending:
+        return {"status": "ok", "results": [prepared["result"] for prepared in prepared_items]}
+
+    client = get_openai_client()
+    batch_file = event_loop.run_until_complete(
+        client.files.create(
+            file=("asset-categorisation-batch.jsonl", b"\n".join(batch_request_line(p) for p in pending)),
+            purpose="batch",
+        )
+    )
+    batch = event_loop.run_until_complete(
+        client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+    )
+    s3.put_object(
+        Bucket=S3_BUCKET,
+        Key=f"{BATCH_RESULTS_PREFIX}{batch.id}/items.json",
+        # image_url is inline image data; started would make collect-time durations span the whole batch.
+        Body=orjson.dumps(
+            [{k: v for k, v in p.items() if k not in ("image_url", "started")} for p in prepared_items]
+        ),
+        ContentType="application/json",
+    )
+    log_event(
+        "INFO",
+        "batch_submitted",
+        aws_request_id=aws_request_id,
+        batch_id=batch.id,
+        item_count=len(prepared_items),
+        request_count=len(pending),
+    )
+    return {"status": "submitted", "batchId": batch.id}
+
+def collect_batch(batch_id: str, aws_request_id: str | None) -> dict:
+    """Return batch progress, or the results in request order once it has completed."""
+    client = get_openai_client()
+    batch = event_loop.run_until_complete(client.batches.retrieve(batch_id))
+    if batch.status != "completed":
+        return {"status": batch.status, "batchId": batch_id}
+
+    manifest = s3.get_object(Bucket=S3_BUCKET, Key=f"{BATCH_RESULTS_PREFIX}{batch_id}/items.json")
+    prepared_items = orjson.loads(manifest["Body"].read())
+    # Item durations logged from here cover collecting the result, not the batch wait.
+    collect_started = time.time()
+    for prepared in prepared_items:
+        prepared["started"] = collect_started
+    output = b""
+    if batch.output_file_id:
+        output = event_loop.run_until_complete(client.files.content(batch.output_file_id)).content
+
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        record = orjson.loads(line)
+        prepared = prepared_items[int(record["custom_id"])]
+        try:
+            message = ((record.get("response") or {}).get("body") or {})["choices"][0]["message"]
+            if message.get("refusal"):
+                raise ValueError(f"Model refused: {message['refusal']}")
+            fields = finalise_fields(loads_model_json(message.get("content") or ""))
+        except (AttributeError, KeyError, IndexError, TypeError, ValueError) as e:
+            fail_item(prepared, f"Inference failed: {record.get('error') or e}", aws_request_id)
+            continue
+        finish_item(prepared, fields, aws_request_id)
+
+    for prepared in prepared_items:
+        if "result" not in prepared:
+            fail_item(prepared, "Missing from batch output", aws_request_id)
+    return {"status": "ok", "batchId": batch_id, "results": [prepared["result"] for prepared in prepared_items]}
+
+def batch_response(payload: dict, aws_request_id: str | None) -> dict:
+    try:
+        if payload["mode"] == "batch":
+            status_code, body = 202, submit_batch(payload["items"], aws_request_id)
+        else:
+            status_code, body = 200, collect_batch(payload["batchId"], aws_request_id)
+    except Exception as e:
+        log_event(
+            "ERROR",
+            "batch_failed",
+            aws_request_id=aws_request_id,
+            mode=payload["mode"],
+            error_message=str(e),
+            traceback=traceback.format_exc(),
+        )
+        status_code, body = 502, {"error": f"Batch {payload['mode']} failed: {e}"}
+    return {
+        "statusCode": status_code,
+        "headers": {"Content-Type": "application/json"},
+        "body": orjson.dumps(body).decode(),
+    }
+
 def process(event, context):
     request_started = time.time()
     aws_request_id = getattr(context, "aws_request_id", None)
@@ -729,7 +1267,7 @@ def process(event, context):
         memory_limit_mb=getattr(context, "memory_limit_in_mb", None),
         bucket=S3_BUCKET,
         model=MODEL,
-        has_openai_api_key=bool(OPENAI_API_KEY),
+        openai_client_ready=_oai is not None,
         event=safe_event_summary(event),
     )
 
@@ -746,72 +1284,27 @@ def process(event, context):
         return {
             "statusCode": 400,
             "headers": {"Content-Type": "application/json"},
-            "body": json.dumps({"error": f"Bad request: {e}"})
+            "body": orjson.dumps({"error": f"Bad request: {e}"}).decode()
         }
 
-    results = []
-    for index, item in enumerate(items):
-        item_started = time.time()
-        prefix = (item or {}).get("ContentVersionId")
-        building_address = (item or {}).get("BuildingAddress")
+    if isinstance(items, dict):
+        return batch_response(items, aws_request_id)
 
+    unique_items, positions = dedupe_items(items)
+    if len(unique_items) < len(items):
         log_event(
             "INFO",
-            "item_processing_started",
+            "duplicate_items_collapsed",
             aws_request_id=aws_request_id,
-            index=index,
-            prefix=prefix,
-            has_building_address=bool(building_address),
+            item_count=len(items),
+            unique_count=len(unique_items),
         )
+    prepared_items = prepare_items(unique_items, aws_request_id)
+    event_loop.run_until_complete(classify_groups(group_for_inference(prepared_items), aws_request_id))
+    results = [prepared_items[position]["result"] for position in positions]
 
-        if not prefix:
-            msg = "Missing ContentVersionId"
-            log_event("ERROR", "item_failed", aws_request_id=aws_request_id, index=index, error_message=msg)
-            results.append(make_error_result(msg))
-            continue
-
-        key = find_key_by_prefix(prefix)
-        if not key:
-            msg = f"No S3 object for prefix '{prefix}'"
-            log_event("ERROR", "item_failed", aws_request_id=aws_request_id, index=index, prefix=prefix, error_message=msg)
-            results.append(make_error_result(msg))
-            continue
-
-        try:
-            url = presign(key)
-            fields = call_openai(url, building_address)
-            results.append(fields)
-            log_event(
-                "INFO",
-                "item_processing_finished",
-                aws_request_id=aws_request_id,
-                index=index,
-                prefix=prefix,
-                s3_key=key,
-                object_type=fields.get("Object_Type_AI__c"),
-                object_category=fields.get("Object_Category_AI__c"),
-                confidence=fields.get("Confidence__c"),
-                has_error="_error" in fields,
-                has_raw_response="_raw_response" in fields,
-                duration_ms=round((time.time() - item_started) * 1000, 2),
-            )
-        except Exception as e:
-            msg = f"Inference failed: {e}"
-            log_event(
-                "ERROR",
-                "item_failed",
-                aws_request_id=aws_request_id,
-                index=index,
-                prefix=prefix,
-                s3_key=key,
-                error_message=msg,
-                traceback=traceback.format_exc(),
-                duration_ms=round((time.time() - item_started) * 1000, 2),
-            )
-            results.append(make_error_result(msg))
-
-    error_count = sum(1 for r in results if "_error" in r or "_raw_response" in r)
-    response_body = json.dumps(results)
+    error_count = sum(1 for r in results if "_error" in r)
+    response_body = orjson.dumps(results).decode()
 
     log_event(
         "INFO" if error_count == 0 else "ERROR",
@@ -821,9 +1314,9 @@ def process(event, context):
         item_count=len(results),
         error_count=error_count,
         response_body_chars=len(response_body),
-        response_preview=response_body[:4000],
         duration_ms=round((time.time() - request_started) * 1000, 2),
     )
+    log_event("DEBUG", "response_preview", aws_request_id=aws_request_id, response_preview=response_body[:4000])
 
     # Return array in SAME ORDER to match Apex's index-based mapping
     return {
@@ -2,13 +2,18 @@ import json
 import boto3
 import os
 import io
+import logging
 import re
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import unquote_plus
-from PIL import Image, ImageFilter, ImageOps
+from PIL import Image, ImageDraw, ImageFilter, ImageOps
 import requests
 
 REGION = os.getenv("AWS_REGION", "eu-west-2")
 
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
 s3 = boto3.client("s3", region_name=REGION)
 rekognition = boto3.client("rekognition", region_name=REGION)
 
@@ -16,6 +21,8 @@ OUTPUT_BUCKET = os.getenv("OUTPUT_BUCKET")
 
 # Optional tuning
 BLUR_RADIUS = int(os.getenv("BLUR_RADIUS", "25"))
+# Blur at 1/BLUR_DOWNSCALE size and scale back up; a redaction blur loses nothing by it
+BLUR_DOWNSCALE = int(os.getenv("BLUR_DOWNSCALE", "4"))
 MIN_TEXT_CONFIDENCE = float(os.getenv("MIN_TEXT_CONFIDENCE", "80"))
 MIN_PLATE_CHARS = int(os.getenv("MIN_PLATE_CHARS", "5"))
 MAX_PLATE_CHARS = int(os.getenv("MAX_PLATE_CHARS", "10"))
@@ -64,11 +71,12 @@ def _download_image_from_s3(bucket, key):
     return response["Body"].read(), response.get("ContentType", "image/jpeg")
 
 
-def _upload_image_to_s3(bucket, key, img_bytes, content_type="image/jpeg"):
+def _upload_image_to_s3(bucket, key, body, content_type="image/jpeg"):
+    # body may be bytes or a file object positioned at the start of the image.
     s3.put_object(
         Bucket=bucket,
         Key=key,
-        Body=img_bytes,
+        Body=body,
         ContentType=content_type,
     )
 
@@ -171,12 +179,26 @@ def _detect_number_plates(image_bytes):
     return plate_bboxes
 
 
+def _blur(region):
+    """
+    Gaussian blur at BLUR_RADIUS. Large areas are reduced first, blurred at the
+    matching smaller radius and resized back, which costs ~1/BLUR_DOWNSCALE^2
+    of a full-size blur and is indistinguishable at redaction strength.
+    """
+    factor = BLUR_DOWNSCALE
+    if factor <= 1 or min(region.size) < factor * 8:
+        return region.filter(ImageFilter.GaussianBlur(radius=BLUR_RADIUS))
+    small = region.reduce(factor).filter(ImageFilter.GaussianBlur(radius=BLUR_RADIUS / factor))
+    return small.resize(region.size, Image.BILINEAR)
+
+
 def _blur_regions(image_bytes, bboxes):
     with Image.open(io.BytesIO(image_bytes)) as img:
         img = img.convert("RGB")
 
         width, height = img.size
 
+        boxes = []
         for bbox in bboxes:
             left = max(0, int(bbox["Left"] * width))
             top = max(0, int(bbox["Top"] * height))
@@ -187,14 +209,33 @@ def _blur_regions(image_bytes, bboxes):
             bottom = min(height, top + box_height)
 
             if right > left and bottom > top:
-                region = img.crop((left, top, right, bottom))
-                blurred_region = region.filter(ImageFilter.GaussianBlur(radius=BLUR_RADIUS))
-                img.paste(blurred_region, (left, top, right, bottom))
-
+                boxes.append((left, top, right, bottom))
+
+        if boxes:
+            # Blur the area covering every region once, then paste it back through
+            # a mask of the regions, instead of one crop/blur/paste per region.
+            area = (
+                min(box[0] for box in boxes),
+                min(box[1] for box in boxes),
+                max(box[2] for box in boxes),
+                max(box[3] for box in boxes),
+            )
+            mask = Image.new("L", (area[2] - area[0], area[3] - area[1]), 0)
+            draw = ImageDraw.Draw(mask)
+            for left, top, right, bottom in boxes:
+                # rectangle() includes its end coordinates
+                draw.rectangle(
+                    (left - area[0], top - area[1], right - area[0] - 1, bottom - area[1] - 1),
+                    fill=255,
+                )
+            blurred_area = _blur(img.crop(area))
+            img.paste(blurred_area, area[:2], mask)
+
+        # Returned as the buffer itself so put_object streams it without a second copy.
         out_buffer = io.BytesIO()
         img.save(out_buffer, format="JPEG", quality=95)
         out_buffer.seek(0)
-        return out_buffer.read(), "image/jpeg"
+        return out_buffer, "image/jpeg"
 
 def _normalize_image_orientation(image_bytes):
     with Image.open(io.BytesIO(image_bytes)) as img:
@@ -275,10 +316,15 @@ def process(event, context):
 
         # Normalize orientation first so detection and blur use the same image layout
         normalized_bytes, normalized_content_type = _normalize_image_orientation(original_bytes)
+        # Only the normalized copy is used from here on; don't hold both in memory.
+        del original_bytes
 
-        # Detect regions on the normalized image
-        face_bboxes = _detect_faces(normalized_bytes)
-        plate_bboxes = _detect_number_plates(normalized_bytes)
+        # Detect regions on the normalized image; the two Rekognition calls are independent
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            faces_future = executor.submit(_detect_faces, normalized_bytes)
+            plates_future = executor.submit(_detect_number_plates, normalized_bytes)
+            face_bboxes = faces_future.result()
+            plate_bboxes = plates_future.result()
 
         all_bboxes = face_bboxes + plate_bboxes
 
@@ -306,9 +352,9 @@ def process(event, context):
                 })
             }
 
-        blurred_bytes, blurred_content_type = _blur_regions(normalized_bytes, all_bboxes)
+        blurred_buffer, blurred_content_type = _blur_regions(normalized_bytes, all_bboxes)
 
-        _upload_image_to_s3(output_bucket, output_key, blurred_bytes, blurred_content_type)
+        _upload_image_to_s3(output_bucket, output_key, blurred_buffer, blurred_content_type)
 
         content_version_id = _extract_content_version_id_from_key(key)
         _notify_salesforce(content_version_id, output_key)
@@ -328,7 +374,12 @@ def process(event, context):
         }
 
     except Exception as e:
-        print("Error in blur Lambda:", str(e))
+        logger.exception(
+            "Error in blur Lambda bucket=%s key=%s request_id=%s",
+            bucket,
+            key,
+            getattr(context, "aws_request_id", None),
+        )
         return {
             "statusCode": 500,
             "body": json.dumps({
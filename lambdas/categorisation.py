@@ -9,29 +9,70 @@ Notes:
     - Uses Amazon Bedrock for text classification.
     - Normalises model output against Salesforce picklist values.
     - Adds extra handling for common alias, label and floor-format variations.
+    - Large backfills can be queued as a Bedrock batch inference job.
 
 Author: Luke Gasson
 """
 
 import json
 import boto3
+import functools
 import logging
-from botocore.client import Config
+import orjson
+from botocore.config import Config
+import os
 import re
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from difflib import SequenceMatcher
 
 # Lambda logging setup
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# AWS clients used by the classifier
-bedrock = boto3.client('bedrock-runtime', region_name='eu-west-2')
-s3      = boto3.client(
-    "s3",
-    region_name="eu-west-2",
-    config=Config(signature_version="s3v4")
+# A smaller, faster model can be trialled via env; replies it cannot produce
+# as valid JSON are retried once on the fallback model.
+MODEL_ID = os.environ.get("CATEGORISATION_MODEL_ID", "anthropic.claude-3-7-sonnet-20250219-v1:0")
+FALLBACK_MODEL_ID = os.environ.get("CATEGORISATION_FALLBACK_MODEL_ID", "anthropic.claude-3-7-sonnet-20250219-v1:0")
+# "optimized" selects Bedrock latency-optimised inference; it is only offered
+# for some models/regions, so switch it on alongside a supported MODEL_ID.
+LATENCY_MODE = os.environ.get("CATEGORISATION_LATENCY_MODE", "standard")
+# Concurrent Bedrock calls per request.
+MAX_WORKERS = int(os.environ.get("CATEGORISATION_MAX_WORKERS", "8"))
+# Asset text longer than this is rejected rather than sent to the model.
+MAX_INPUT_CHARS = int(os.environ.get("CATEGORISATION_MAX_INPUT_CHARS", "8000"))
+
+# Bedrock batch inference for large backfills. Inputs and outputs live under
+# BATCH_PREFIX in BATCH_BUCKET; Bedrock assumes BATCH_ROLE_ARN to read and write them.
+BATCH_BUCKET = os.environ.get("CATEGORISATION_BATCH_BUCKET", "")
+BATCH_PREFIX = "categorisation/batches/"
+BATCH_ROLE_ARN = os.environ.get("CATEGORISATION_BATCH_ROLE_ARN", "")
+# Bedrock rejects jobs with fewer records than this, so smaller backfills run inline.
+BATCH_MIN_RECORDS = int(os.environ.get("CATEGORISATION_BATCH_MIN_RECORDS", "100"))
+
+# AWS client used by the classifier. It is thread-safe; size the pool so every
+# worker gets a connection and keep idle connections alive across warm invocations.
+bedrock = boto3.client(
+    'bedrock-runtime',
+    region_name='eu-west-2',
+    config=Config(
+        retries={"max_attempts": 3, "mode": "adaptive"},
+        tcp_keepalive=True,
+        max_pool_connections=MAX_WORKERS * 2,
+        connect_timeout=3,
+        read_timeout=60,
+    ),
 )
-MODEL_ID = "anthropic.claude-3-7-sonnet-20250219-v1:0"
+
+# Only batch requests need these, so they are built on first use rather than at cold start.
+@functools.cache
+def _s3():
+    return boto3.client("s3", region_name="eu-west-2")
+
+@functools.cache
+def _bedrock_jobs():
+    return boto3.client("bedrock", region_name="eu-west-2")
 
 def _norm(s: str) -> str:
     s = (s or "").lower().strip()
@@ -109,12 +150,12 @@ def extract_json_object(text: str) -> dict:
     # 1) Handle responses wrapped in JSON/code fences.
     fence = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", s, flags=re.DOTALL | re.IGNORECASE)
     if fence:
-        return json.loads(fence.group(1))
+        return orjson.loads(fence.group(1))
 
     # 2) Otherwise, extract the first JSON object from the response.
     obj = re.search(r"(\{.*\})", s, flags=re.DOTALL)
     if obj:
-        return json.loads(obj.group(1))
+        return orjson.loads(obj.group(1))
 
     raise ValueError(f"No JSON object found in model output: {s[:120]!r}")
 
@@ -189,10 +230,6 @@ CANONICAL_FLOORS_SET = set(
     [f"Basement Mezzanine B{n}" for n in (1,2,3)]
 )
 
-def to_picklist_or_none(v: str | None) -> str | None:
-    v = (v or "").strip()
-    return v if v in CANONICAL_FLOORS_SET else None
-
 CANONICAL_FLOORS = {
     "ground floor": "Ground Floor",
     "gf": "Ground Floor",
@@ -226,15 +263,30 @@ CANONICAL_FLOORS["basement mezzanine b1"] = "Basement Mezzanine B1"
 CANONICAL_FLOORS["basement mezzanine b2"] = "Basement Mezzanine B2"
 CANONICAL_FLOORS["basement mezzanine b3"] = "Basement Mezzanine B3"
 
+# Dictionary tokens in priority order: longest first, ties in insertion order.
+FLOOR_TOKENS = sorted(CANONICAL_FLOORS, key=len, reverse=True)
+FLOOR_TOKEN_RANK = {token: i for i, token in enumerate(FLOOR_TOKENS)}
+# One scan for every token. The lookahead reports the best token starting at
+# each position (overlaps included), so the lowest-ranked hit overall is the
+# same token the one-search-per-token loop would have picked.
+RE_FLOOR_TOKEN = re.compile(r"(?=\b(" + "|".join(map(re.escape, FLOOR_TOKENS)) + r")\b)")
+
 ORDINALS = { 1: "1st Floor", 2: "2nd Floor", 3: "3rd Floor", **{n: f"{n}th Floor" for n in range(4, 51)} }
 MEZZ_ORDINALS = { 1: "1st Mezzanine", 2: "2nd Mezzanine", 3: "3rd Mezzanine", **{n: f"{n}th Mezzanine" for n in range(4, 51)} }
 
-# compile regexes once
-RE_LEVEL = re.compile(r"\b(?:level|lvl|lv)\s*(\d{1,2})\b", re.I)
-RE_FLOOR_NUM = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s*(?:floor|flr|fl)\b", re.I)
-RE_MEZZ_NUM = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s*(?:mezz|mezzanine)\b", re.I)
-RE_BASEMENT_MEZZ = re.compile(r"\bbasement\s+mezz(?:anine)?\s*(b[1-3])\b", re.I)
-RE_B_MEZZ = re.compile(r"\bb\s*(\d{1,2})\s*mezz(?:anine)?\b", re.I)
+# compile regexes once. Every numbered floor form is one alternative of a single
+# pattern so the text is scanned once; extract_floor groups the hits by
+# alternative and still checks them in its priority order. The lookahead keeps
+# overlapping hits (e.g. "Level 0 Mezz"), as separate scans per form would.
+RE_FLOOR_PARTS = re.compile(
+    r"(?=(?P<basement_mezz>\bbasement\s+mezz(?:anine)?\s*(?P<basement_mezz_n>b[1-3])\b)"
+    r"|(?P<b_mezz>\bb\s*(?P<b_mezz_n>\d{1,2})\s*mezz(?:anine)?\b)"
+    r"|(?P<basement>\b(?:basement(?:\s*(?P<basement_n>\d))?|b\s*(?P<b_n>\d))\b(?!\s*mezz))"
+    r"|(?P<level>\b(?:level|lvl|lv)\s*(?P<level_n>\d{1,2})\b)"
+    r"|(?P<floor_num>\b(?P<floor_num_n>\d{1,2})(?:st|nd|rd|th)?\s*(?:floor|flr|fl)\b)"
+    r"|(?P<mezz_num>\b(?P<mezz_num_n>\d{1,2})(?:st|nd|rd|th)?\s*(?:mezz|mezzanine)\b))",
+    re.I,
+)
 
 def nearest_to_location(text, matches):
     if not matches: return None
@@ -247,35 +299,39 @@ def normalise(s):
     return re.sub(r"\s+", " ", s.lower()).strip()
 
 def extract_floor(raw: str) -> str | None:
+    """Return the Salesforce floor picklist value (CANONICAL_FLOORS_SET) the text refers to, if any."""
     if not raw: return None
     txt = " ".join(raw.split())  # collapse whitespace
     low = txt.lower()
 
+    parts = {}
+    for m in RE_FLOOR_PARTS.finditer(txt):
+        parts.setdefault(m.lastgroup, []).append(m)
+
     # 1) explicit basement mezz: "Basement Mezzanine B2"
-    m = nearest_to_location(txt, list(RE_BASEMENT_MEZZ.finditer(txt)))
+    m = nearest_to_location(txt, parts.get("basement_mezz"))
     if m:
-        token = f"basement mezzanine {m.group(1).lower()}"
+        token = f"basement mezzanine {m.group('basement_mezz_n').lower()}"
         return CANONICAL_FLOORS.get(token)
     
     # 1b) "B5 Mezzanine" => "B5 Mezzanine"
-    m = nearest_to_location(txt, list(RE_B_MEZZ.finditer(txt)))
+    m = nearest_to_location(txt, parts.get("b_mezz"))
     if m:
-        n = int(m.group(1))
+        n = int(m.group("b_mezz_n"))
         if 1 <= n <= 50:
-            return f"B{n} Mezzanine"
+            # The picklist only goes up to B5 Mezzanine.
+            return f"B{n} Mezzanine" if n <= 5 else None
 
 
     # 2) simple dictionary hits (GF/LG/Mezz/Roof/External)
-    for token in sorted(CANONICAL_FLOORS.keys(), key=len, reverse=True):
-        if re.search(rf"\b{re.escape(token)}\b", low):
-            return CANONICAL_FLOORS[token]
+    hits = RE_FLOOR_TOKEN.findall(low)
+    if hits:
+        return CANONICAL_FLOORS[min(hits, key=FLOOR_TOKEN_RANK.__getitem__)]
 
     # 3) basement B# / "Basement #"
-    m = nearest_to_location(
-        txt,
-        list(re.finditer(r"\b(?:basement(?:\s*(\d))?|b\s*(\d))\b(?!\s*mezz)", txt, re.I)))
+    m = nearest_to_location(txt, parts.get("basement"))
     if m:
-        g1, g2 = m.group(1), m.group(2)
+        g1, g2 = m.group("basement_n"), m.group("b_n")
         if g1 or g2:
             n = int(g1 or g2)
             if 1 <= n <= 5:
@@ -285,23 +341,23 @@ def extract_floor(raw: str) -> str | None:
             return "Basement 1"
 
     # 4) "Level 7" => "7th Floor"
-    m = nearest_to_location(txt, list(RE_LEVEL.finditer(txt)))
+    m = nearest_to_location(txt, parts.get("level"))
     if m:
-        n = int(m.group(1))
+        n = int(m.group("level_n"))
         if 1 <= n <= 50:
             return ORDINALS[n]
 
     # 5) "3rd floor", "4 fl", "2 flr"
-    m = nearest_to_location(txt, list(RE_FLOOR_NUM.finditer(txt)))
+    m = nearest_to_location(txt, parts.get("floor_num"))
     if m:
-        n = int(m.group(1))
+        n = int(m.group("floor_num_n"))
         if 1 <= n <= 50:
             return ORDINALS[n]
 
     # 6) "2nd mezz", "1 mezzanine"
-    m = nearest_to_location(txt, list(RE_MEZZ_NUM.finditer(txt)))
+    m = nearest_to_location(txt, parts.get("mezz_num"))
     if m:
-        n = int(m.group(1))
+        n = int(m.group("mezz_num_n"))
         if 1 <= n <= 50:
             return MEZZ_ORDINALS[n]
 
@@ -481,6 +537,8 @@ OBJECT_MAP: dict[str, list[str]] = {
 }
 
 OBJECT_TYPES = list(OBJECT_MAP.keys())
+# Membership view of OBJECT_MAP for validation; the lists keep their order for the prompt.
+OBJECT_CATEGORIES: dict[str, frozenset[str]] = {t: frozenset(cats) for t, cats in OBJECT_MAP.items()}
 ENUMS_JSON = json.dumps({"OBJECT_TYPES": OBJECT_TYPES, "CATEGORIES_BY_TYPE": OBJECT_MAP}, ensure_ascii=False)
 
 def validate_extraction(result: dict) -> dict:
@@ -499,11 +557,11 @@ def validate_extraction(result: dict) -> dict:
     t = out.get("Object_Type__c")
     c = out.get("Object_Category__c")
 
-    if t not in OBJECT_MAP:
+    if t not in OBJECT_CATEGORIES:
         out["Object_Type__c"] = None
         out["Object_Category__c"] = ""
     else:
-        allowed = OBJECT_MAP.get(t, [])
+        allowed = OBJECT_CATEGORIES[t]
         if not allowed:
             # This type has no categories; force empty string (not None)
             out["Object_Category__c"] = ""
@@ -546,20 +604,67 @@ def extract_first_step_line(text: str):
     m = RE_STEP_LINE.search(text)
     return m.group(1).strip() if m else None
 
+# The fully structured form from the prompt's first example:
+#   "<Object Type> - Location: <where>. Type: <category>. Test: <instruction>"
+RE_STRUCTURED = re.compile(
+    r"^(?P<type>[^-]+?)\s+-\s+Location:\s*(?P<location>.+?)\.\s*"
+    r"Type:\s*(?P<category>.+?)\.?\s*Test:\s*(?P<test>.+?)\.?$",
+    re.IGNORECASE | re.DOTALL,
+)
+# Anything the prompt has special rules for goes to the model instead.
+RE_NEEDS_MODEL = re.compile(
+    r"testing|instruction|procedure|what3words|test result|\bstep\s*\d|label\s*:",
+    re.IGNORECASE,
+)
+# Only the asset code prefixes the prompt lists; a catch-all would turn floor
+# tokens such as "B1" or "L2" in the location into labels.
+RE_SHORT_CODE = re.compile(r"\b((?:MCP|FAP|FF|FK|EL|EM|CP|SD|HD|SB|R)\d{1,3})\b", re.IGNORECASE)
+
+# Types whose Name acronym is unambiguous: two or more plain words, e.g.
+# "Emergency Light" -> "EL". Single words, qualifiers like "(Automatic)" or
+# "- Single", and the Fire Alarm Panel label special case are left to the model.
+RE_PLAIN_MULTIWORD_TYPE = re.compile(r"[A-Za-z]+(?: [A-Za-z]+)+")
+RULE_EXCLUDED_TYPES = {"Fire Alarm Panel", "Testing Procedures"}
+
+def object_type_acronym(obj_type: str) -> str | None:
+    if obj_type in RULE_EXCLUDED_TYPES or not RE_PLAIN_MULTIWORD_TYPE.fullmatch(obj_type):
+        return None
+    return "".join(w[0] for w in obj_type.split()).upper()
 
-def classify_asset_text(text):
+def rule_classify(text: str) -> dict | None:
+    """
+    Parse the fully structured input form without calling Bedrock, following
+    the prompt's rules and its structured example. Returns None for anything
+    else, including unknown object types and types without an unambiguous
+    acronym, so the model handles it.
+    """
+    m = RE_STRUCTURED.match((text or "").strip())
+    if not m or RE_NEEDS_MODEL.search(text):
+        return None
+    obj_type = next((t for t in OBJECT_TYPES if t.lower() == m.group("type").strip().lower()), None)
+    acronym = object_type_acronym(obj_type) if obj_type else None
+    if acronym is None:
+        return None
 
-    _t = (text or "").lower()
-    if "bsra" in _t and ("complete" in _t or "completed" in _t):
-        return {
-            "Object_Type__c": "BSRA",
-            "Object_Category__c": "",
-            "Asset_Instructions__c": "BSRA completed",
-            "Label__c": "",
-            "Name": "BSRA"
-        }
-    
-    prompt = f"""
+    test = m.group("test").strip()
+    # The prompt takes a short asset code from anywhere in the text; the test wins.
+    code = RE_SHORT_CODE.search(test) or RE_SHORT_CODE.search(m.group("location"))
+    label = code.group(1).upper() if code else ""
+    location = m.group("location").strip()
+    name_parts = [location, acronym] + ([label] if label else [])
+    return {
+        "Object_Type__c": obj_type,
+        "Object_Category__c": m.group("category").strip(),
+        "Asset_Instructions__c": test,
+        "Label__c": label,
+        "Name": ", ".join(name_parts),
+        "What3Words__c": "",
+        "TEST_RESULT__c": "",
+    }
+
+# Static instructions sent ahead of every input. Kept byte-identical across calls
+# so Bedrock can serve the prefix from its prompt cache.
+STATIC_PROMPT = f"""
     You are classifying facility safety assets for Metro Safety. The input may be well structured
     (e.g., "Emergency Light - Location: 7th Floor ... Type: ... Test: ...") OR free text with no labels.
     Your job is to extract or sensibly infer the following Salesforce fields and output ONLY a single JSON object.
@@ -621,7 +726,7 @@ def classify_asset_text(text):
         set Label__c to exactly "Step <number>" (JUST the word “Step” and the number, no following text).
         Examples: “Step 7: Open the valve …” → Label__c = "Step 7"; “... proceed to Step 3 ...” → Label__c = "Step 3".
     3) ELSE prefer a short asset code anywhere in the text, typically one of:
-        FF\d+, FK\d+, EL\d+, EM\d+, CP\d+, MCP\d+, FAP\d+, SD\d+, HD\d+, SB\d+, R\d+, or generally [A-Z]{1,3}\d{1,3}.
+        FF\\d+, FK\\d+, EL\\d+, EM\\d+, CP\\d+, MCP\\d+, FAP\\d+, SD\\d+, HD\\d+, SB\\d+, R\\d+, or generally [A-Z]{1,3}\\d{1,3}.
     - Return Label__c as-is for sentence-like labels; uppercase only the short code tokens (e.g., "FF1", "FK11").
     - If none of the above are found, set Label__c to an empty string "".
     - SPECIAL CASE (Fire Alarm Panel):
@@ -653,7 +758,7 @@ def classify_asset_text(text):
     - If “testing instructions/procedures” appears later in a normal/freeform description (e.g., after "Label:", "Type:", "Location:", or mid-paragraph), DO NOT use the override.
     - Keep Object_Type__c as the actual asset (e.g., "Installation Valve", "Electric Pump"), chosen from OBJECT_TYPES.
     - Set Object_Category__c from an explicit subtype (e.g., "Wet System"); otherwise "".
-    - Label__c: If a “Step <number>: …” line exists anywhere, use the FULL step line. Otherwise prefer a short code (e.g., FF\d+, EL\d+, etc., or [A-Z]{1,3}\d{1,3}); return null if none.
+    - Label__c: If a “Step <number>: …” line exists anywhere, use the FULL step line. Otherwise prefer a short code (e.g., FF\\d+, EL\\d+, etc., or [A-Z]{1,3}\\d{1,3}); return null if none.
     - Asset_Instructions__c: Use the first explicit test step sentence if present; otherwise the first clear imperative testing sentence; otherwise "".
     - Name: Build as "<Location Guess> <Object Type Acronym><Label__c>" (no commas).
         Example: "Ground Floor Entrance Lobby Wall FAP1".
@@ -717,55 +822,352 @@ def classify_asset_text(text):
 
     Now classify this input:
 
-    {text}
     """
-    payload = {
-        "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens":        2000,
-        "temperature":       0.0,
-        "messages": [
-            { "role": "user", "content": prompt }
-        ]
-    }
 
+# Forcing this tool makes Claude return the fields as an already-parsed object.
+OUTPUT_FIELDS = [
+    "Object_Type__c", "Object_Category__c", "Asset_Instructions__c", "Label__c",
+    "Name", "What3Words__c", "TEST_RESULT__c",
+]
+EMIT_ASSET_TOOL = {
+    "name": "emit_asset",
+    "description": "Record the Salesforce fields extracted from the asset text.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            field: {"type": ["string", "null"] if field == "Label__c" else "string"}
+            for field in OUTPUT_FIELDS
+        },
+        "required": OUTPUT_FIELDS,
+    },
+}
+# Fields every model reply must carry before it is mapped and validated.
+REQUIRED_OUTPUT_FIELDS = OUTPUT_FIELDS[:5]
+
+
+def check_output_shape(out) -> dict:
+    """Raise ValueError unless the reply has every required field as a string (or null)."""
+    if not isinstance(out, dict):
+        raise ValueError(f"Expected a JSON object, got {type(out).__name__}")
+    missing = [k for k in REQUIRED_OUTPUT_FIELDS if k not in out]
+    if missing:
+        raise ValueError(f"Missing fields in model output: {missing}")
+    wrong = [k for k in REQUIRED_OUTPUT_FIELDS if out[k] is not None and not isinstance(out[k], str)]
+    if wrong:
+        raise ValueError(f"Non-string fields in model output: {wrong}")
+    return out
+
+_INPUT_PLACEHOLDER = "__INPUT__"
+_PAYLOAD_HEAD, _PAYLOAD_TAIL = orjson.dumps({
+    "anthropic_version": "bedrock-2023-05-31",
+    "max_tokens":        2000,
+    "temperature":       0.0,
+    "tools":             [EMIT_ASSET_TOOL],
+    "tool_choice":       {"type": "tool", "name": EMIT_ASSET_TOOL["name"]},
+    "messages": [
+        {
+            "role": "user",
+            "content": [
+                # "Input: " is constant too, so it sits inside the cached prefix;
+                # only the raw asset text follows the breakpoint.
+                {"type": "text", "text": STATIC_PROMPT + "Input: ", "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": _INPUT_PLACEHOLDER},
+            ],
+        }
+    ]
+}).split(orjson.dumps(_INPUT_PLACEHOLDER))
+
+# input text -> validated fields, reused for the life of the warm container.
+# temperature is 0, so the same text classifies the same way.
+_result_cache: dict[str, dict] = {}
+RESULT_CACHE_MAX_ENTRIES = 4096
+# Texts currently being classified; a thread that misses the cache while the
+# same text is in flight waits for that result instead of calling Bedrock again.
+_inflight: dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+def cache_key(text) -> str:
+    # Re-scans often differ only in spacing and line breaks; let those share a result.
+    return " ".join((text or "").split())
+
+def classify_asset_text(text):
+    key = cache_key(text)
+    cached = _result_cache.get(key)
+    if cached is not None:
+        logger.info("classify_asset_text: cache hit")
+        return dict(cached)
+
+    with _inflight_lock:
+        # Re-check under the lock: the owner stores its result before leaving _inflight.
+        cached = _result_cache.get(key)
+        fut = _inflight.get(key) if cached is None else None
+        owner = cached is None and fut is None
+        if owner:
+            fut = _inflight[key] = Future()
+    if cached is not None:
+        return dict(cached)
+    if not owner:
+        logger.info("classify_asset_text: waiting on in-flight classification")
+        return dict(fut.result())
+
+    try:
+        out = _classify_uncached(text)
+    except Exception as e:
+        fut.set_exception(e)
+        raise
+    else:
+        if len(_result_cache) >= RESULT_CACHE_MAX_ENTRIES:
+            _result_cache.clear()
+        # Callers add fields to the result, so the cache keeps its own copy.
+        _result_cache[key] = dict(out)
+        fut.set_result(_result_cache[key])
+        return out
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+def _classify_uncached(text):
+    # Completed BSRAs get the fixed result whatever form the text takes.
+    out = bsra_shortcut(text)
+    if out is not None:
+        return out
+    out = rule_classify(text)
+    if out is not None:
+        logger.info("classify_asset_text: parsed structured input without Bedrock")
+        out["Object_Category__c"] = map_category(out["Object_Type__c"], out["Object_Category__c"], OBJECT_MAP)
+        out = validate_extraction(out)
+    else:
+        out = _classify_with_bedrock(text)
+    return out
+
+def bsra_shortcut(text):
+    _t = (text or "").lower()
+    if "bsra" in _t and ("complete" in _t or "completed" in _t):
+        return {
+            "Object_Type__c": "BSRA",
+            "Object_Category__c": "",
+            "Asset_Instructions__c": "BSRA completed",
+            "Label__c": "",
+            "Name": "BSRA"
+        }
+    return None
+
+def bedrock_body(text) -> bytes:
+    # Only the input differs between calls; splice it into the pre-serialised request.
+    return _PAYLOAD_HEAD + orjson.dumps(text) + _PAYLOAD_TAIL
+
+def parse_model_output(data: dict) -> dict:
+    """Pull the fields out of a Claude messages response and clamp them to the picklists."""
+    content = data.get("content", [])
+    tool_use = next((part for part in content if part.get("type") == "tool_use"), None)
+    if tool_use is not None:
+        out = dict(tool_use.get("input") or {})
+    else:
+        # Plain text reply: Claude normally answers in a single block; only join when it doesn't.
+        if len(content) == 1:
+            text_out = content[0].get("text", "")
+        else:
+            text_out = "".join(part.get("text", "") for part in content)
+        out = extract_json_object(text_out)
+    check_output_shape(out)
+
+    out["Object_Category__c"] = map_category(
+    out.get("Object_Type__c", ""),
+    out.get("Object_Category__c", ""),
+    OBJECT_MAP
+    )
+    # Enforce closed-world enums
+    return validate_extraction(out)
+
+def _classify_with_bedrock(text, model_id=MODEL_ID):
     resp = bedrock.invoke_model(
-        modelId     = MODEL_ID,
-        body        = json.dumps(payload),
+        modelId     = model_id,
+        body        = bedrock_body(text),
         contentType = "application/json",
-        accept      = "application/json"
+        accept      = "application/json",
+        performanceConfigLatency = LATENCY_MODE,
     )
-    raw = resp["body"].read().decode("utf-8")
-    logger.info("<< classify_asset_text: raw Bedrock response: %s", raw)
+    raw = resp["body"].read()
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("<< classify_asset_text: raw Bedrock response: %s", raw.decode("utf-8"))
 
     # parse the JSON blob out of Bedrock’s response
     try:
-        data = json.loads(raw)
-        text_out = "".join(part.get("text", "") for part in data.get("content", []))
-        out = extract_json_object(text_out)
-
-        out["Object_Category__c"] = map_category(
-        out.get("Object_Type__c", ""),
-        out.get("Object_Category__c", ""),
-        OBJECT_MAP
+        data = orjson.loads(raw)
+        usage = data.get("usage") or {}
+        logger.info(
+            "classify_asset_text: prompt cache read=%s write=%s",
+            usage.get("cache_read_input_tokens"), usage.get("cache_creation_input_tokens"),
         )
-        # Enforce closed-world enums
-        out = validate_extraction(out)
-        return out
+        return parse_model_output(data)
     except Exception as e:
+        if FALLBACK_MODEL_ID and model_id != FALLBACK_MODEL_ID:
+            logger.warning("Unparseable response from %s (%s); retrying on %s", model_id, e, FALLBACK_MODEL_ID)
+            return _classify_with_bedrock(text, FALLBACK_MODEL_ID)
         logger.error("Failed to parse classification response: %s", e)
         raise
 
+def classify_sample(txt):
+    """Classify one input and add its floor; failures become an error entry."""
+    if not isinstance(txt, str):
+        return {"error": "input must be a string", "input": txt}
+    if not txt.strip():
+        return {"error": "empty input", "input": txt}
+    if len(txt) > MAX_INPUT_CHARS:
+        return {"error": "input too long", "input": txt[:200]}
+    try:
+        return add_floor(classify_asset_text(txt), txt)
+    except Exception as ex:
+        logger.warning("process: classification error for input '%s': %s", txt, ex, exc_info=True)
+        return {"error": str(ex), "input": txt}
+
+def add_floor(out, txt):
+    # Floor canonicalisation
+    floor = extract_floor(txt)  # always a CANONICAL_FLOORS_SET value or None
+    logger.info("Floor extracted: %s | from text: %s", floor, txt[:200])
+
+    out["Floor__c"] = floor
+    return out
+
+def classify_samples(samples):
+    # Classify each distinct sample once; the Bedrock calls are independent, so overlap them.
+    positions = {}
+    for i, txt in enumerate(samples):
+        positions.setdefault(txt, []).append(i)
+    unique = list(positions)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(unique)))) as executor:
+        unique_results = list(executor.map(classify_sample, unique))
+
+    # Scatter back so results stay in the same order as the request.
+    results = [None] * len(samples)
+    for txt, res in zip(unique, unique_results):
+        for i in positions[txt]:
+            results[i] = res
+    return results
+
+def needs_model(txt) -> bool:
+    if not isinstance(txt, str):
+        return False
+    key = cache_key(txt)
+    return (
+        bool(key)
+        and len(txt) <= MAX_INPUT_CHARS
+        and key not in _result_cache
+        and bsra_shortcut(txt) is None
+        and rule_classify(txt) is None
+    )
+
+def batch_record(index, txt) -> bytes:
+    model_input = orjson.loads(bedrock_body(txt))
+    # Batch jobs are billed at the batch rate already and do not take cache_control.
+    model_input["messages"][0]["content"][0].pop("cache_control", None)
+    return orjson.dumps({"recordId": str(index), "modelInput": model_input})
+
+def submit_batch(samples: list) -> dict:
+    """
+    Queue a backfill as a Bedrock batch inference job instead of classifying inline.
+
+    Inputs that need no model call (blank, cached, rule-parsed) are resolved
+    now and the rest are written to S3 as one JSONL record each. The samples
+    and resolved results are kept beside them so collect_batch can return
+    results in request order.
+    """
+    pending = [i for i, txt in enumerate(samples) if needs_model(txt)]
+    if len(pending) < BATCH_MIN_RECORDS:
+        return {"status": "ok", "results": classify_samples(samples)}
+
+    pending_set = set(pending)
+    results = [None if i in pending_set else classify_sample(txt) for i, txt in enumerate(samples)]
+
+    job_name = f"categorisation-{uuid.uuid4().hex}"
+    base = f"{BATCH_PREFIX}{job_name}/"
+    _s3().put_object(
+        Bucket=BATCH_BUCKET,
+        Key=f"{base}input.jsonl",
+        Body=b"\n".join(batch_record(i, samples[i]) for i in pending),
+    )
+    _s3().put_object(
+        Bucket=BATCH_BUCKET,
+        Key=f"{base}items.json",
+        Body=orjson.dumps({"samples": samples, "results": results}),
+    )
+    job = _bedrock_jobs().create_model_invocation_job(
+        jobName=job_name,
+        roleArn=BATCH_ROLE_ARN,
+        modelId=MODEL_ID,
+        inputDataConfig={"s3InputDataConfig": {"s3Uri": f"s3://{BATCH_BUCKET}/{base}input.jsonl"}},
+        outputDataConfig={"s3OutputDataConfig": {"s3Uri": f"s3://{BATCH_BUCKET}/{base}output/"}},
+    )
+    logger.info("submit_batch: queued %d of %d samples as %s", len(pending), len(samples), job["jobArn"])
+    return {"status": "Submitted", "jobArn": job["jobArn"]}
+
+def collect_batch(job_arn: str) -> dict:
+    """Return job progress, or the results in request order once Bedrock has finished."""
+    job = _bedrock_jobs().get_model_invocation_job(jobIdentifier=job_arn)
+    if job["status"] not in ("Completed", "PartiallyCompleted"):
+        return {"status": job["status"], "jobArn": job_arn}
+
+    base = f"{BATCH_PREFIX}{job['jobName']}/"
+    manifest = orjson.loads(_s3().get_object(Bucket=BATCH_BUCKET, Key=f"{base}items.json")["Body"].read())
+    samples, results = manifest["samples"], manifest["results"]
+    job_id = job_arn.rsplit("/", 1)[-1]
+    output = _s3().get_object(Bucket=BATCH_BUCKET, Key=f"{base}output/{job_id}/input.jsonl.out")["Body"].read()
+
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        record = orjson.loads(line)
+        i = int(record["recordId"])
+        txt = samples[i]
+        try:
+            if record.get("error"):
+                raise ValueError(record["error"])
+            results[i] = add_floor(parse_model_output(record["modelOutput"]), txt)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning("collect_batch: record %s failed: %s", i, e)
+            results[i] = {"error": f"Inference failed: {e}", "input": txt}
+
+    for i, res in enumerate(results):
+        if res is None:
+            results[i] = {"error": "Missing from batch output", "input": samples[i]}
+    return {"status": "ok", "results": results}
+
+def batch_response(payload: dict) -> dict:
+    try:
+        if payload["mode"] == "batch":
+            samples = [(obj.get("input") or "") for obj in payload["items"]]
+            body = submit_batch(samples)
+            # Small batches are classified inline; only a queued job is still pending.
+            status_code = 200 if body["status"] == "ok" else 202
+        else:
+            status_code, body = 200, collect_batch(payload["jobArn"])
+    except Exception as e:
+        logger.exception("process: batch %s failed", payload["mode"])
+        status_code, body = 502, {"error": f"Batch {payload['mode']} failed: {e}"}
+    return {
+        "statusCode": status_code,
+        "headers": {"Content-Type": "application/json"},
+        "body": orjson.dumps(body).decode()
+    }
+
 def process(event, context):
-    logger.info("<< process: received event: %s", json.dumps(event))
+    # Full payload dumps only at DEBUG; they are large and billed per byte in CloudWatch.
+    logger.debug("<< process: received event: %s", event)
 
     # 1) Parse HTTP body (JSON array)
     try:
-        body = json.loads(event.get("body", "[]"))
+        body = orjson.loads(event.get("body", "[]"))
     except Exception as e:
         logger.error("process: could not decode event['body']: %s", e, exc_info=True)
         raise
 
-    logger.info(">> process: HTTP body parsed as: %s", body)
+    logger.debug(">> process: HTTP body parsed as: %s", body)
+
+    # Backfills: {"mode": "batch", "items": [...]} queues a Bedrock batch job and
+    # {"mode": "batch_status", "jobArn": ...} collects it.
+    if isinstance(body, dict) and body.get("mode") in ("batch", "batch_status"):
+        return batch_response(body)
 
     # 2) Extract inputs for Claude, but also pick up description/contentVersionId for later use
     samples = []
@@ -777,30 +1179,17 @@ def process(event, context):
         samples.append(base)
         metadata.append({"description": desc, "contentVersionId": cvid})
 
-    logger.info(">> process: assembled samples for model: %s", samples)
-    logger.info(">> process: collected metadata (unused for now): %s", metadata)
+    logger.info(">> process: assembled %d samples for model", len(samples))
+    logger.debug(">> process: assembled samples for model: %s", samples)
+    logger.debug(">> process: collected metadata (unused for now): %s", metadata)
 
     # 3) Classify each sample
-    results = []
-    for txt in samples:
-        try:
-            out = classify_asset_text(txt)
-
-            # Floor canonicalisation
-            floor = extract_floor(txt)
-            floor = to_picklist_or_none(floor)
-            logger.info("Floor extracted: %s | from text: %s", floor, txt[:200])
-
-            out["Floor__c"] = floor
-            results.append(out)
-        except Exception as ex:
-            logger.warning("process: classification error for input '%s': %s", txt, ex, exc_info=True)
-            results.append({"error": str(ex), "input": txt})
+    results = classify_samples(samples)
 
-    logger.info("<< process: returning results: %s", results)
+    logger.debug("<< process: returning results: %s", results)
 
     return {
         "statusCode": 200,
         "headers": {"Content-Type": "application/json"},
-        "body": json.dumps(results)
+        "body": orjson.dumps(results).decode()
     }
@@ -1,29 +1,82 @@
+import asyncio
 import base64
-import json
+import hashlib
+import io
 import logging
 import os
 import re
+import time
+from collections.abc import Callable
 from typing import Any
 
 import boto3
-from openai import OpenAI
+import orjson
+from botocore.config import Config
+from botocore.exceptions import ClientError
 
 
 MODEL = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
 ASSET_BUCKET = os.environ.get("ASSET_BUCKET", "metrosafetyprod")
 MAX_IMAGES = int(os.environ.get("GAM_MAX_IMAGES", "4"))
+MAX_BATCH_ASSETS = int(os.environ.get("GAM_MAX_BATCH_ASSETS", "8"))
+MAX_CONCURRENT_REQUESTS = int(os.environ.get("GAM_MAX_CONCURRENT_REQUESTS", "4"))
 PRESIGNED_URL_SECONDS = int(os.environ.get("PRESIGNED_URL_SECONDS", "900"))
+BATCH_RESULTS_PREFIX = os.environ.get("GAM_BATCH_RESULTS_PREFIX", "gam/batches/")
+# Batch statuses after which no more output will be written.
+BATCH_FINISHED_STATUSES = frozenset({"completed", "expired", "failed", "cancelled"})
+IMAGE_DETAIL = os.environ.get("GAM_IMAGE_DETAIL", "auto")
+CACHE_TABLE = os.environ.get("GAM_CACHE_TABLE", "")
+CACHE_TTL_SECONDS = int(os.environ.get("GAM_CACHE_TTL_SECONDS", str(30 * 24 * 60 * 60)))
+# The OpenAI SDK retries 408/409/429/5xx, timeouts and connection errors with
+# jittered exponential backoff; 2 retries gives 3 attempts in total.
+OPENAI_MAX_RETRIES = int(os.environ.get("GAM_OPENAI_MAX_RETRIES", "2"))
+# OpenAI scales high-detail images to fit 2048px, then to a 768px short side.
+VISION_MAX_EDGE = 2048
+VISION_MAX_SHORT_EDGE = 768
 
 logger = logging.getLogger()
 logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
 
-s3 = boto3.client("s3")
+# Batched requests resolve images from worker threads, so size the pool for
+# the concurrent lookups and keep idle connections alive between calls.
+AWS_CLIENT_CONFIG = Config(
+    retries={"max_attempts": 2, "mode": "standard"},
+    tcp_keepalive=True,
+    max_pool_connections=20,
+)
+
+s3 = boto3.client("s3", config=AWS_CLIENT_CONFIG)
+# Built on first cache use; the low-level client avoids the slower
+# resource layer at cold start.
+_dynamodb = None
+
+
+def _get_secret_value(secret_arn: str) -> dict[str, Any]:
+    """Read a secret, preferring the Parameters and Secrets Lambda Extension.
+
+    The extension serves from an in-process cache on localhost once the layer
+    is attached and PARAMETERS_SECRETS_EXTENSION_HTTP_PORT is set; otherwise
+    fall back to a direct Secrets Manager call.
+    """
+    port = os.environ.get("PARAMETERS_SECRETS_EXTENSION_HTTP_PORT")
+    if not port:
+        return boto3.client("secretsmanager").get_secret_value(SecretId=secret_arn)
+
+    import urllib.request
+    from urllib.parse import quote
+
+    request = urllib.request.Request(
+        f"http://localhost:{port}/secretsmanager/get?secretId={quote(secret_arn, safe='')}",
+        headers={"X-Aws-Parameters-Secrets-Token": os.environ["AWS_SESSION_TOKEN"]},
+    )
+    with urllib.request.urlopen(request, timeout=2) as response:
+        return orjson.loads(response.read())
 
 
 def _load_openai_key() -> str:
     secret_arn = os.environ.get("OPENAI_SECRET_ARN")
     if secret_arn:
-        value = boto3.client("secretsmanager").get_secret_value(SecretId=secret_arn)
+        value = _get_secret_value(secret_arn)
         secret = value.get("SecretString")
         if secret is None:
             secret = base64.b64decode(value["SecretBinary"]).decode("utf-8")
@@ -35,7 +88,68 @@ def _load_openai_key() -> str:
     return api_key
 
 
-openai_client = OpenAI(api_key=_load_openai_key())
+# The OpenAI SDK (with httpx and pydantic) is imported on first use rather
+# than at module load, keeping it off the cold-start path. The clients are
+# then cached so warm invocations reuse the pooled TLS connections.
+_openai_api_key = None
+_openai_client = None
+_async_openai_client = None
+# Pooled async connections are bound to the loop that opened them, so keep a
+# single loop for the container rather than asyncio.run() per invocation.
+event_loop = asyncio.new_event_loop()
+
+
+def _http_client_options() -> dict[str, Any]:
+    import httpx
+
+    return {
+        "timeout": httpx.Timeout(60.0, connect=5.0),
+        "limits": httpx.Limits(
+            max_keepalive_connections=10,
+            max_connections=20,
+            keepalive_expiry=300,
+        ),
+    }
+
+
+def _get_openai_api_key() -> str:
+    global _openai_api_key
+    if _openai_api_key is None:
+        _openai_api_key = _load_openai_key()
+    return _openai_api_key
+
+
+def get_dynamodb_client():
+    global _dynamodb
+    if _dynamodb is None:
+        _dynamodb = boto3.client("dynamodb", config=AWS_CLIENT_CONFIG)
+    return _dynamodb
+
+
+def get_openai_client():
+    global _openai_client
+    if _openai_client is None:
+        from openai import DefaultHttpxClient, OpenAI
+
+        _openai_client = OpenAI(
+            api_key=_get_openai_api_key(),
+            max_retries=OPENAI_MAX_RETRIES,
+            http_client=DefaultHttpxClient(**_http_client_options()),
+        )
+    return _openai_client
+
+
+def get_async_openai_client():
+    global _async_openai_client
+    if _async_openai_client is None:
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        _async_openai_client = AsyncOpenAI(
+            api_key=_get_openai_api_key(),
+            max_retries=OPENAI_MAX_RETRIES,
+            http_client=DefaultAsyncHttpxClient(**_http_client_options()),
+        )
+    return _async_openai_client
 
 
 # Initial GAM fields agreed for the first tuning release. Parked fields are
@@ -116,6 +230,17 @@ ASSET_CONDITION_VALUES = [
 ]
 
 
+FIRE_SAFETY_CLASSIFICATIONS = (
+    "Passive Fire Protection (PFP)",
+    "Active Fire Protection (AFP)",
+    "Fire Safety Management (FSM)",
+    "Mixed or Combined System",
+    "Not a Fire-Safety Asset",
+    "Insufficient Information",
+)
+FIRE_SAFETY_CONFIDENCES = ("High", "Medium", "Low")
+
+
 # Verified entries from the official Uniclass Products table (April 2026).
 # Rules are deliberately narrow: an unmatched asset remains unclassified rather
 # than accepting a code invented from model memory.
@@ -472,33 +597,195 @@ Fire-safety classification rules:
 - Return JSON only, with no Markdown.
 """.strip()
 
+# Fields the Lambda always sets itself after the model responds, so the model
+# is not asked to generate them.
+LAMBDA_OWNED_FIELDS = frozenset({
+    "UNSPSC_Verification_Status__c",
+    "Uniclass_Code__c",
+    "Uniclass_Title__c",
+    "Uniclass_Table__c",
+    "Uniclass_Version__c",
+    "Uniclass_Confidence__c",
+    "Uniclass_Verification_Status__c",
+    "Classification_Review_Required__c",
+})
+FIELD_ENUMS: dict[str, list[str]] = {
+    "Asset_Condition__c": [*ASSET_CONDITION_VALUES, ""],
+    "Fire_Safety_Classification__c": list(FIRE_SAFETY_CLASSIFICATIONS),
+    "Fire_Safety_Classification_Confidence__c": list(FIRE_SAFETY_CONFIDENCES),
+}
+
+
+def _field_schema(key: str, default: Any) -> dict[str, Any]:
+    if key in FIELD_ENUMS:
+        return {"type": "string", "enum": FIELD_ENUMS[key]}
+    if isinstance(default, bool):
+        return {"type": "boolean"}
+    if isinstance(default, float):
+        return {"type": "number"}
+    return {"type": "string"}
+
+
+# Strict structured outputs: the model is constrained to exactly these keys
+# and types, so malformed JSON and missing fields are rejected model-side.
+ASSET_SCHEMA: dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        key: _field_schema(key, default)
+        for key, default in OUTPUT_DEFAULTS.items()
+        if key not in LAMBDA_OWNED_FIELDS
+    },
+    "required": [key for key in OUTPUT_DEFAULTS if key not in LAMBDA_OWNED_FIELDS],
+    "additionalProperties": False,
+}
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "gam_asset", "strict": True, "schema": ASSET_SCHEMA},
+}
+BATCH_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "gam_asset_batch",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"results": {"type": "array", "items": ASSET_SCHEMA}},
+            "required": ["results"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# The static parts of every request are built once per container; only the
+# asset context and image blocks are assembled per call.
+SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+# Only the fields the model fills in; the Lambda-owned ones are set afterwards.
+OUTPUT_FIELDS_PART = {
+    "type": "text",
+    "text": "OUTPUT_FIELDS: "
+    + orjson.dumps({key: OUTPUT_DEFAULTS[key] for key in ASSET_SCHEMA["properties"]}).decode(),
+}
+
+
+# Cached results are only valid for the prompt and output contract that
+# produced them.
+PROMPT_FINGERPRINT = hashlib.sha256(
+    SYSTEM_PROMPT.encode("utf-8")
+    + orjson.dumps(OUTPUT_DEFAULTS)
+    + orjson.dumps(ASSET_SCHEMA)
+).hexdigest()[:16]
+# Every request opens with the same system prompt and OUTPUT_FIELDS part, so
+# the same routing key keeps them on servers that already hold that prefix.
+PROMPT_CACHE_KEY = f"gam-{PROMPT_FINGERPRINT}"
+
+
+def _cache_key(asset: dict[str, Any]) -> str:
+    """Key a result on the model, prompt and the full asset request.
+
+    Salesforce creates a new ContentVersion for every uploaded file version,
+    so the image contentVersionIds already identify the image contents.
+    """
+    digest = hashlib.sha256(
+        orjson.dumps(asset, option=orjson.OPT_SORT_KEYS, default=str)
+    ).hexdigest()
+    return f"{MODEL}:{PROMPT_FINGERPRINT}:{digest}"
+
+
+def _idempotency_headers(assets: list[dict[str, Any]]) -> dict[str, str]:
+    """Tag a request so a retry or re-invocation of the same work is recognisable."""
+    digest = hashlib.sha256(
+        "|".join(_cache_key(asset) for asset in assets).encode("utf-8")
+    ).hexdigest()
+    return {"Idempotency-Key": f"gam-{digest}"}
+
+
+def _cache_get(asset: dict[str, Any]) -> dict[str, Any] | None:
+    if not CACHE_TABLE:
+        return None
+    try:
+        item = get_dynamodb_client().get_item(
+            TableName=CACHE_TABLE, Key={"cacheKey": {"S": _cache_key(asset)}}
+        ).get("Item")
+    except ClientError as exc:
+        logger.warning("GAM cache lookup failed: %s", exc)
+        return None
+    if not item or int(item.get("expiresAt", {}).get("N", 0)) < time.time():
+        return None
+    logger.info("GAM cache hit asset_id=%s", asset.get("id"))
+    return orjson.loads(item["fields"]["S"])
+
+
+def _cache_put(asset: dict[str, Any], fields: dict[str, Any]) -> None:
+    if not CACHE_TABLE:
+        return
+    # An empty or refused reply leaves only defaults; retry it next time
+    # rather than serving the blank analysis for the whole TTL.
+    if not fields.get("What_Is_It__c"):
+        logger.info("GAM cache skip, empty analysis asset_id=%s", asset.get("id"))
+        return
+    try:
+        get_dynamodb_client().put_item(
+            TableName=CACHE_TABLE,
+            Item={
+                "cacheKey": {"S": _cache_key(asset)},
+                # Stored as JSON text so floats do not need Decimal conversion.
+                "fields": {"S": orjson.dumps(fields).decode()},
+                "expiresAt": {"N": str(int(time.time()) + CACHE_TTL_SECONDS)},
+            },
+        )
+    except ClientError as exc:
+        logger.warning("GAM cache write failed: %s", exc)
+
 
 def _response(status_code: int, body: dict[str, Any]) -> dict[str, Any]:
     return {
         "statusCode": status_code,
         "headers": {"Content-Type": "application/json"},
-        "body": json.dumps(body),
+        "body": orjson.dumps(body).decode(),
     }
 
 
 def _parse_event(event: Any) -> dict[str, Any]:
+    # Direct invokes arrive already deserialised by the runtime; only proxy
+    # (API Gateway / Function URL) events carry a JSON body that still needs
+    # parsing. orjson reads bytes directly, so base64 bodies skip a UTF-8 decode.
     payload = event
     if isinstance(event, dict) and "body" in event:
-        body = event.get("body") or "{}"
+        body = event.get("body") or {}
         if event.get("isBase64Encoded") and isinstance(body, str):
-            body = base64.b64decode(body).decode("utf-8")
-        payload = json.loads(body) if isinstance(body, str) else body
-    elif isinstance(event, str):
-        payload = json.loads(event)
+            body = base64.b64decode(body)
+        payload = orjson.loads(body) if isinstance(body, (str, bytes)) else body
+    elif isinstance(event, (str, bytes)):
+        payload = orjson.loads(event)
 
     if not isinstance(payload, dict):
         raise ValueError("Payload must be a JSON object")
-    asset = payload.get("asset")
+
+    mode = payload.get("mode")
+    if mode == "batch_status":
+        if not payload.get("batchId"):
+            raise ValueError("batchId is required for batch_status")
+        return payload
+    if mode == "batch" and "assets" not in payload:
+        raise ValueError("'assets' is required for batch mode")
+
+    if "assets" in payload:
+        assets = payload["assets"]
+        if not isinstance(assets, list) or not assets:
+            raise ValueError("'assets' must be a non-empty JSON array")
+        for asset in assets:
+            _validate_asset(asset)
+        return payload
+
+    _validate_asset(payload.get("asset"))
+    return payload
+
+
+def _validate_asset(asset: Any) -> None:
     if not isinstance(asset, dict):
         raise ValueError("Payload must contain an 'asset' JSON object")
     if not asset.get("id"):
         raise ValueError("asset.id is required")
-    return payload
 
 
 def _presign_s3_key(s3_key: str) -> str:
@@ -540,7 +827,7 @@ def _find_s3_key(content_version_id: str) -> str:
     return latest_key
 
 
-def _image_url(image: dict[str, Any]) -> str:
+def _image_s3_key(image: dict[str, Any]) -> str:
     content_version_id = str(image.get("contentVersionId") or "").strip()
     if not content_version_id:
         raise ValueError("Every asset image must contain contentVersionId")
@@ -551,11 +838,73 @@ def _image_url(image: dict[str, Any]) -> str:
         content_version_id,
         s3_key,
     )
-    return _presign_s3_key(s3_key)
+    return s3_key
 
 
-def _build_user_content(payload: dict[str, Any]) -> list[dict[str, Any]]:
-    asset = payload["asset"]
+def _image_url(image: dict[str, Any]) -> str:
+    # Interactive requests always hand OpenAI a presigned URL so it fetches the
+    # image from S3 itself; the bytes never pass through this Lambda.
+    return _presign_s3_key(_image_s3_key(image))
+
+
+def _vision_scale(size: tuple[int, int]) -> float:
+    width, height = size
+    return min(VISION_MAX_EDGE / max(width, height), VISION_MAX_SHORT_EDGE / min(width, height))
+
+
+def _downscale_for_vision(image_bytes: bytes) -> tuple[bytes, str] | None:
+    """Shrink a photo to the largest size the vision model will actually use.
+
+    Returns None when the image is already small enough or cannot be decoded,
+    in which case the original bytes should be sent unchanged.
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            scale = _vision_scale(img.size)
+            if scale >= 1.0:
+                return None
+
+            # JPEGs are decoded straight to 1/2, 1/4 or 1/8 scale, so a phone
+            # photo never needs its full-resolution bitmap in memory.
+            img.draft("RGB", (round(img.width * scale), round(img.height * scale)))
+            img = ImageOps.exif_transpose(img)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            scale = _vision_scale(img.size)
+            if scale < 1.0:
+                img = img.resize(
+                    (round(img.width * scale), round(img.height * scale)),
+                    Image.Resampling.LANCZOS,
+                )
+
+            out_buffer = io.BytesIO()
+            img.save(out_buffer, format="JPEG", quality=85, optimize=True)
+            return out_buffer.getvalue(), "image/jpeg"
+    except OSError as exc:  # includes PIL.UnidentifiedImageError
+        logger.warning("Sending image without downscaling: %s", exc)
+        return None
+
+
+def _image_data_url(image: dict[str, Any]) -> str:
+    """Inline the image for Batch API requests, which outlive presigned URLs."""
+    obj = s3.get_object(Bucket=ASSET_BUCKET, Key=_image_s3_key(image))
+    content_type = obj.get("ContentType") or "image/jpeg"
+    image_bytes = obj["Body"].read()
+
+    downscaled = _downscale_for_vision(image_bytes)
+    if downscaled:
+        image_bytes, content_type = downscaled
+
+    return f"data:{content_type};base64,{base64.b64encode(image_bytes).decode('ascii')}"
+
+
+def _asset_content(
+    asset: dict[str, Any],
+    image_url: Callable[[dict[str, Any]], str] = _image_url,
+) -> tuple[list[dict[str, Any]], int]:
+    """Return the context and image content blocks for one asset."""
     images = asset.get("images") or []
     if not isinstance(images, list):
         raise ValueError("asset.images must be a JSON array")
@@ -566,11 +915,7 @@ def _build_user_content(payload: dict[str, Any]) -> list[dict[str, Any]]:
     content: list[dict[str, Any]] = [
         {
             "type": "text",
-            "text": "OUTPUT_FIELDS: " + json.dumps(OUTPUT_DEFAULTS),
-        },
-        {
-            "type": "text",
-            "text": "SALESFORCE_ASSET_CONTEXT: " + json.dumps(asset_context, default=str),
+            "text": "SALESFORCE_ASSET_CONTEXT: " + orjson.dumps(asset_context, default=str).decode(),
         },
     ]
 
@@ -578,11 +923,17 @@ def _build_user_content(payload: dict[str, Any]) -> list[dict[str, Any]]:
     for image in images[:MAX_IMAGES]:
         if not isinstance(image, dict):
             raise ValueError("Every item in asset.images must be a JSON object")
-        url = _image_url(image)
+        url = image_url(image)
         if url:
-            content.append({"type": "image_url", "image_url": {"url": url}})
+            content.append({"type": "image_url", "image_url": {"url": url, "detail": IMAGE_DETAIL}})
             image_count += 1
+    return content, image_count
 
+
+def _build_user_content(payload: dict[str, Any]) -> list[dict[str, Any]]:
+    content: list[dict[str, Any]] = [OUTPUT_FIELDS_PART]
+    asset_content, image_count = _asset_content(payload["asset"])
+    content.extend(asset_content)
     content.append(
         {
             "type": "text",
@@ -592,6 +943,36 @@ def _build_user_content(payload: dict[str, Any]) -> list[dict[str, Any]]:
     return content
 
 
+def _build_batch_user_content(
+    assets: list[dict[str, Any]],
+    image_url: Callable[[dict[str, Any]], str] = _image_url,
+) -> list[dict[str, Any]]:
+    """Pack several assets into one request so the system prompt is sent once."""
+    content: list[dict[str, Any]] = [OUTPUT_FIELDS_PART]
+    for index, asset in enumerate(assets):
+        asset_content, image_count = _asset_content(asset, image_url)
+        content.append(
+            {
+                "type": "text",
+                "text": f"ASSET {index} ({image_count} image(s)):",
+            }
+        )
+        content.extend(asset_content)
+
+    content.append(
+        {
+            "type": "text",
+            "text": (
+                f"Analyse each of the {len(assets)} assets above independently, "
+                "using only its own context and images. Return one JSON object "
+                'of the form {"results": [...]} containing exactly one '
+                "OUTPUT_FIELDS object per asset, in ASSET order."
+            ),
+        }
+    )
+    return content
+
+
 def _coerce_result(raw: dict[str, Any]) -> dict[str, Any]:
     result = dict(OUTPUT_DEFAULTS)
     for key in OUTPUT_DEFAULTS:
@@ -621,45 +1002,323 @@ def _coerce_result(raw: dict[str, Any]) -> dict[str, Any]:
     result["Uniclass_Verification_Status__c"] = "Unverified AI suggestion"
     result["Classification_Review_Required__c"] = True
 
-    allowed_fire_classes = {
-        "Passive Fire Protection (PFP)",
-        "Active Fire Protection (AFP)",
-        "Fire Safety Management (FSM)",
-        "Mixed or Combined System",
-        "Not a Fire-Safety Asset",
-        "Insufficient Information",
-    }
-    if result["Fire_Safety_Classification__c"] not in allowed_fire_classes:
+    if result["Fire_Safety_Classification__c"] not in FIRE_SAFETY_CLASSIFICATIONS:
         result["Fire_Safety_Classification__c"] = "Insufficient Information"
 
-    if result["Fire_Safety_Classification_Confidence__c"] not in {"High", "Medium", "Low"}:
+    if result["Fire_Safety_Classification_Confidence__c"] not in FIRE_SAFETY_CONFIDENCES:
         result["Fire_Safety_Classification_Confidence__c"] = "Low"
     return result
 
 
+def _read_json_stream(stream: Any) -> bytes:
+    """Collect streamed content until the top-level JSON object closes.
+
+    The stream is closed as soon as the object is complete, so trailing
+    tokens are not waited for.
+    """
+    buffer = bytearray()
+    depth = 0
+    in_string = False
+    escaped = False
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            piece = chunk.choices[0].delta.content or ""
+            for index, char in enumerate(piece):
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif char == "\\":
+                        escaped = True
+                    elif char == '"':
+                        in_string = False
+                elif char == '"':
+                    in_string = True
+                elif char == "{":
+                    depth += 1
+                elif char == "}":
+                    depth -= 1
+                    if depth == 0:
+                        buffer += piece[:index + 1].encode("utf-8")
+                        return bytes(buffer)
+            buffer += piece.encode("utf-8")
+    finally:
+        stream.close()
+    return bytes(buffer) or b"{}"
+
+
 def _analyse(payload: dict[str, Any]) -> dict[str, Any]:
-    response = openai_client.chat.completions.create(
+    cached = _cache_get(payload["asset"])
+    if cached is not None:
+        return cached
+
+    stream = get_openai_client().chat.completions.create(
         model=MODEL,
         messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
+            SYSTEM_MESSAGE,
             {"role": "user", "content": _build_user_content(payload)},
         ],
-        response_format={"type": "json_object"},
+        response_format=RESPONSE_FORMAT,
         temperature=0.1,
+        stream=True,
+        prompt_cache_key=PROMPT_CACHE_KEY,
+        extra_headers=_idempotency_headers([payload["asset"]]),
     )
-    text = response.choices[0].message.content or "{}"
-    parsed = json.loads(text)
+    parsed = orjson.loads(_read_json_stream(stream))
     if not isinstance(parsed, dict):
         raise ValueError("OpenAI response was not a JSON object")
     result = _coerce_result(parsed)
     _apply_deterministic_fields(result, payload)
+    _cache_put(payload["asset"], result)
     return result
 
 
+def _parse_batch_results(
+    assets: list[dict[str, Any]], text: str
+) -> list[dict[str, Any]]:
+    parsed = orjson.loads(text)
+    raw_results = parsed.get("results") if isinstance(parsed, dict) else None
+    if not isinstance(raw_results, list) or len(raw_results) != len(assets):
+        raise ValueError("OpenAI batch response did not contain one result per asset")
+
+    results = []
+    for asset, raw in zip(assets, raw_results, strict=True):
+        if not isinstance(raw, dict):
+            raise ValueError("OpenAI batch result was not a JSON object")
+        result = _coerce_result(raw)
+        _apply_deterministic_fields(result, {"asset": asset})
+        results.append(result)
+    return results
+
+
+async def _analyse_batch(
+    assets: list[dict[str, Any]], semaphore: asyncio.Semaphore
+) -> list[dict[str, Any]]:
+    """Analyse up to MAX_BATCH_ASSETS assets with a single model request."""
+    async with semaphore:
+        # S3 lookups and presigning are blocking boto3 calls.
+        content = await asyncio.to_thread(_build_batch_user_content, assets)
+        response = await get_async_openai_client().chat.completions.create(
+            model=MODEL,
+            messages=[
+                SYSTEM_MESSAGE,
+                {"role": "user", "content": content},
+            ],
+            response_format=BATCH_RESPONSE_FORMAT,
+            temperature=0.1,
+            prompt_cache_key=PROMPT_CACHE_KEY,
+            extra_headers=_idempotency_headers(assets),
+        )
+    return _parse_batch_results(assets, response.choices[0].message.content or "{}")
+
+
+async def _analyse_assets_async(
+    batches: list[list[dict[str, Any]]],
+) -> list[list[dict[str, Any]] | BaseException]:
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    # return_exceptions keeps one failed batch from discarding its siblings'
+    # (already paid for) results; the caller re-raises after caching them.
+    return await asyncio.gather(
+        *(_analyse_batch(batch, semaphore) for batch in batches),
+        return_exceptions=True,
+    )
+
+
+def _analyse_assets(assets: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Serve cached assets, then run the remaining batches concurrently."""
+    fields = [_cache_get(asset) for asset in assets]
+    misses = [index for index, cached in enumerate(fields) if cached is None]
+    if misses:
+        batches = [
+            misses[start:start + MAX_BATCH_ASSETS]
+            for start in range(0, len(misses), MAX_BATCH_ASSETS)
+        ]
+        outcomes = event_loop.run_until_complete(
+            _analyse_assets_async([[assets[index] for index in batch] for batch in batches])
+        )
+        first_error = None
+        for batch, outcome in zip(batches, outcomes, strict=True):
+            if isinstance(outcome, BaseException):
+                first_error = first_error or outcome
+                continue
+            for index, asset_fields in zip(batch, outcome, strict=True):
+                fields[index] = asset_fields
+                _cache_put(assets[index], asset_fields)
+        if first_error is not None:
+            raise first_error
+    return fields
+
+
+def _batch_request_line(custom_id: str, assets: list[dict[str, Any]]) -> bytes:
+    body = {
+        "model": MODEL,
+        "messages": [
+            SYSTEM_MESSAGE,
+            {
+                "role": "user",
+                "content": _build_batch_user_content(assets, _image_data_url),
+            },
+        ],
+        "response_format": BATCH_RESPONSE_FORMAT,
+        "temperature": 0.1,
+        "prompt_cache_key": PROMPT_CACHE_KEY,
+    }
+    return orjson.dumps(
+        {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": body,
+        }
+    )
+
+
+def _submit_batch(assets: list[dict[str, Any]]) -> dict[str, Any]:
+    """Queue a backfill with the OpenAI Batch API instead of calling it inline.
+
+    Images are inlined because the 24 hour completion window outlives any
+    presigned URL. The submitted assets are kept in S3 so the results can be
+    mapped back to them when the batch is collected.
+    """
+    lines = []
+    for start in range(0, len(assets), MAX_BATCH_ASSETS):
+        lines.append(
+            _batch_request_line(str(start), assets[start:start + MAX_BATCH_ASSETS])
+        )
+
+    batch_file = get_openai_client().files.create(
+        file=("gam-batch.jsonl", b"\n".join(lines)),
+        purpose="batch",
+    )
+    batch = get_openai_client().batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    s3.put_object(
+        Bucket=ASSET_BUCKET,
+        Key=f"{BATCH_RESULTS_PREFIX}{batch.id}/assets.json",
+        Body=orjson.dumps(assets),
+        ContentType="application/json",
+    )
+    logger.info(
+        "Submitted GAM batch %s assets=%s requests=%s",
+        batch.id,
+        len(assets),
+        len(lines),
+    )
+    return {"status": "submitted", "batchId": batch.id}
+
+
+def _batch_record_error(record: dict[str, Any]) -> str | None:
+    """The error a batch output or error file line reports, if any."""
+    response = record.get("response") or {}
+    error = record.get("error") or (response.get("body") or {}).get("error")
+    if not error:
+        return None
+    if isinstance(error, dict):
+        return str(error.get("message") or error)
+    return str(error)
+
+
+def _collect_batch(batch_id: str) -> dict[str, Any]:
+    """
+    Return batch progress, or the mapped results once the batch has finished.
+
+    Expired, failed and cancelled batches still return whatever requests
+    completed before they stopped, with their batch status instead of "ok".
+    """
+    client = get_openai_client()
+    batch = client.batches.retrieve(batch_id)
+    if batch.status not in BATCH_FINISHED_STATUSES:
+        return {"status": batch.status, "batchId": batch_id}
+
+    manifest = s3.get_object(
+        Bucket=ASSET_BUCKET, Key=f"{BATCH_RESULTS_PREFIX}{batch_id}/assets.json"
+    )
+    assets = orjson.loads(manifest["Body"].read())
+
+    results: list[dict[str, Any]] = [
+        {"assetId": asset["id"], "planStudioId": asset.get("planStudioId")}
+        for asset in assets
+    ]
+    # Failed requests are written to the error file, not the output file.
+    lines: list[bytes] = []
+    for file_id in (batch.output_file_id, getattr(batch, "error_file_id", None)):
+        if file_id:
+            lines.extend(client.files.content(file_id).content.splitlines())
+    for line in lines:
+        if not line.strip():
+            continue
+        record = orjson.loads(line)
+        start = int(record["custom_id"])
+        chunk = assets[start:start + MAX_BATCH_ASSETS]
+        error = _batch_record_error(record)
+        if error is None:
+            try:
+                response = (record.get("response") or {}).get("body") or {}
+                text = response["choices"][0]["message"]["content"] or "{}"
+                fields = _parse_batch_results(chunk, text)
+            except (KeyError, IndexError, TypeError, ValueError) as exc:
+                error = str(exc)
+        if error is not None:
+            logger.warning("GAM batch %s request %s failed: %s", batch_id, start, error)
+            for result in results[start:start + len(chunk)]:
+                result["error"] = error
+            continue
+        for result, asset_fields in zip(results[start:start + len(chunk)], fields, strict=True):
+            result["fields"] = asset_fields
+
+    missing = "Missing from batch output" if batch.status == "completed" else f"Batch {batch.status}"
+    for result in results:
+        if "fields" not in result and "error" not in result:
+            result["error"] = missing
+
+    results_key = f"{BATCH_RESULTS_PREFIX}{batch_id}/results.json"
+    s3.put_object(
+        Bucket=ASSET_BUCKET,
+        Key=results_key,
+        Body=orjson.dumps(results),
+        ContentType="application/json",
+    )
+    return {
+        "status": "ok" if batch.status == "completed" else batch.status,
+        "batchId": batch_id,
+        "resultsKey": results_key,
+        "results": results,
+    }
+
+
 def process(event, context):
     """AWS Lambda handler used by POST /gam."""
     try:
         payload = _parse_event(event)
+        mode = payload.get("mode")
+        if mode == "batch":
+            return _response(202, _submit_batch(payload["assets"]))
+        if mode == "batch_status":
+            return _response(200, _collect_batch(payload["batchId"]))
+
+        if "assets" in payload:
+            assets = payload["assets"]
+            logger.info("GAM batch request assets=%s", len(assets))
+            fields = _analyse_assets(assets)
+            return _response(
+                200,
+                {
+                    "status": "ok",
+                    "results": [
+                        {
+                            "assetId": asset["id"],
+                            "planStudioId": asset.get("planStudioId"),
+                            "fields": asset_fields,
+                        }
+                        for asset, asset_fields in zip(assets, fields, strict=True)
+                    ],
+                },
+            )
+
         asset = payload["asset"]
         logger.info(
             "GAM request asset_id=%s images=%s",
@@ -677,7 +1336,7 @@ def process(event, context):
                 "fields": fields,
             },
         )
-    except (json.JSONDecodeError, ValueError) as exc:
+    except (orjson.JSONDecodeError, ValueError) as exc:
         logger.warning("Bad GAM request: %s", exc)
         return _response(400, {"status": "error", "message": str(exc)})
     except Exception as exc:
@@ -288,12 +288,14 @@ def proof_plain_text(text, record_id):
             "temperature": 0
         }
 
-        logger.info("Sending payload to Bedrock: " + json.dumps(payload, indent=2))
+        body = json.dumps(payload)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Sending payload to Bedrock: %s", body)
         response = bedrock_client.invoke_model(
             modelId=BEDROCK_MODEL_ID,
             contentType="application/json",
             accept="application/json",
-            body=json.dumps(payload)
+            body=body
         )
         response_body = json.loads(response["body"].read().decode("utf-8"))
         model_text = " ".join(
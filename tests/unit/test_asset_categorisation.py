@@ -0,0 +1,392 @@
+import asyncio
+import base64
+import io
+import json
+from types import SimpleNamespace
+
+import boto3
+import pytest
+from moto import mock_aws
+from PIL import Image
+
+
+@pytest.fixture
+def asset_categorisation(aws_credentials, monkeypatch):
+    # import here as the OpenAI client is built from env at module load.
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.delenv("OPENAI_SECRET_ARN", raising=False)
+    from lambdas import asset_categorisation
+
+    return asset_categorisation
+
+
+def test_items_are_processed_concurrently_in_request_order(asset_categorisation, mocker):
+    mocker.patch.object(asset_categorisation, "find_key_by_prefix", side_effect=lambda prefix: f"{prefix}/photo.jpg")
+    mocker.patch.object(asset_categorisation, "image_data_url", side_effect=lambda key: f"https://example.com/{key}")
+
+    async def fake_call_openai(url, building_address):
+        # later items finish first, so ordering must come from the request index.
+        await asyncio.sleep(0.05 if "068A" in url else 0.0)
+        return {"What_Is_It__c": url, "Confidence__c": 0.5}
+
+    mocker.patch.object(asset_categorisation, "call_openai", side_effect=fake_call_openai)
+    event = [{"ContentVersionId": "068A"}, {}, {"ContentVersionId": "068C"}]
+
+    response = asset_categorisation.process(event, None)
+
+    body = json.loads(response["body"])
+    assert response["statusCode"] == 200
+    assert body[0]["What_Is_It__c"] == "https://example.com/068A/photo.jpg"
+    assert body[1]["_error"] == "Missing ContentVersionId"
+    assert body[2]["What_Is_It__c"] == "https://example.com/068C/photo.jpg"
+
+
+@mock_aws
+def test_find_key_by_prefix_skips_blurred_and_caches_hits(asset_categorisation):
+    s3 = boto3.client("s3")
+    s3.create_bucket(Bucket=asset_categorisation.S3_BUCKET)
+    s3.put_object(Bucket=asset_categorisation.S3_BUCKET, Key="068X/photo.jpg", Body=b"a")
+    s3.put_object(Bucket=asset_categorisation.S3_BUCKET, Key="068X/photo_blurred.jpg", Body=b"b")
+
+    assert asset_categorisation.find_key_by_prefix("068X") == "068X/photo.jpg"
+    s3.delete_object(Bucket=asset_categorisation.S3_BUCKET, Key="068X/photo.jpg")
+    assert asset_categorisation.find_key_by_prefix("068X") == "068X/photo.jpg"
+    assert asset_categorisation.find_key_by_prefix("068Y") is None
+
+
+@mock_aws
+def test_find_key_by_prefix_reads_past_a_truncated_page(asset_categorisation, mocker):
+    mocker.patch.object(asset_categorisation, "PREFIX_LIST_MAX_KEYS", 2)
+    s3 = boto3.client("s3")
+    s3.create_bucket(Bucket=asset_categorisation.S3_BUCKET)
+    # The first page holds only blurred derivatives; the original is on the next one.
+    for name in ("a_blurred", "b_blurred", "c"):
+        s3.put_object(Bucket=asset_categorisation.S3_BUCKET, Key=f"068W/{name}.jpg", Body=b"x")
+
+    assert asset_categorisation.find_key_by_prefix("068W") == "068W/c.jpg"
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Broken - needs replacement", "C5 - Asset Unserviceable"),
+        ("Obsolete, REPLACE soon", "C4 - Requires renewal"),
+        ("Faulty sounder", "C3 - Maintenance required to return to an accepted level of service"),
+        ("Dusty housing", "C2 - Needs cleaning"),
+        ("Slight scuffing", "C2 - Minor Defects Only"),
+        ("Good", "C1 - Very Good Condition"),
+        (None, "C2 - Minor Defects Only"),
+    ],
+)
+def test_normalize_asset_condition(asset_categorisation, text, expected):
+    assert asset_categorisation.normalize_asset_condition(text) == expected
+
+
+@mock_aws
+def test_image_data_url_inlines_a_downscaled_jpeg(asset_categorisation):
+    s3 = boto3.client("s3")
+    s3.create_bucket(Bucket=asset_categorisation.S3_BUCKET)
+    buffer = io.BytesIO()
+    Image.new("RGBA", (3000, 2000), "red").save(buffer, format="PNG")
+    s3.put_object(Bucket=asset_categorisation.S3_BUCKET, Key="068P/photo.png", Body=buffer.getvalue())
+
+    data_url = asset_categorisation.image_data_url("068P/photo.png")
+
+    prefix, encoded = data_url.split(",", 1)
+    assert prefix == "data:image/jpeg;base64"
+    with Image.open(io.BytesIO(base64.b64decode(encoded))) as img:
+        assert img.size == (1024, 683)
+
+
+def _completion(body: dict):
+    choice = SimpleNamespace(message=SimpleNamespace(content=json.dumps(body)), finish_reason="stop")
+    return SimpleNamespace(id="resp_1", choices=[choice], usage=None)
+
+
+def test_call_openai_sends_static_prompt_as_a_shared_prefix(asset_categorisation, mocker):
+    create = mocker.patch.object(
+        asset_categorisation.get_openai_client().chat.completions,
+        "create",
+        new_callable=mocker.AsyncMock,
+        return_value=_completion({"Object_Type_AI__c": "Sounder", "Asset_Condition__c": "good", "Confidence__c": "0.7"}),
+    )
+
+    data = asset_categorisation.event_loop.run_until_complete(
+        asset_categorisation.call_openai("data:image/jpeg;base64,AAAA", "1 High Street")
+    )
+
+    messages = create.call_args.kwargs["messages"]
+    assert messages[0] is asset_categorisation.SYSTEM_MESSAGE
+    assert "OBJECT_MAP" not in json.dumps(messages[1])
+    assert messages[1]["content"][1]["image_url"]["detail"] == asset_categorisation.IMAGE_DETAIL
+    assert create.call_args.kwargs["prompt_cache_key"] == asset_categorisation.PROMPT_CACHE_KEY
+    assert create.call_args.kwargs["response_format"] is asset_categorisation.RESPONSE_FORMAT
+    assert create.call_args.kwargs["temperature"] == 0
+    assert create.call_args.kwargs["max_completion_tokens"] == asset_categorisation.MAX_TOKENS_PER_IMAGE
+    assert data["Asset_Condition__c"] == "C1 - Very Good Condition"
+    assert data["Confidence__c"] == 0.7
+
+
+def test_error_result_has_every_field(asset_categorisation):
+    result = asset_categorisation.make_error_result("boom")
+
+    assert result["_error"] == "boom"
+    assert result.keys() - {"_error"} == asset_categorisation.RESULT_DEFAULTS.keys()
+    assert "_error" not in asset_categorisation.RESULT_DEFAULTS
+    with pytest.raises(TypeError):
+        asset_categorisation.RESULT_DEFAULTS["What_Is_It__c"] = "Sounder"
+
+
+def test_loads_model_json_accepts_nan(asset_categorisation):
+    assert asset_categorisation.loads_model_json('{"a": 1}') == {"a": 1}
+    assert asset_categorisation.loads_model_json('{"a": NaN}')["a"] != 0
+
+
+def test_items_sharing_an_address_are_classified_in_one_request(asset_categorisation, mocker):
+    mocker.patch.object(asset_categorisation, "find_key_by_prefix", side_effect=lambda prefix: f"{prefix}/photo.jpg")
+    mocker.patch.object(asset_categorisation, "image_data_url", side_effect=lambda key: f"data:{key}")
+    create = mocker.patch.object(
+        asset_categorisation.get_openai_client().chat.completions,
+        "create",
+        new_callable=mocker.AsyncMock,
+        return_value=_completion({"results": [{"What_Is_It__c": "Sounder"}, {"What_Is_It__c": "Beacon"}]}),
+    )
+    event = [
+        {"ContentVersionId": "068A", "BuildingAddress": "1 High Street"},
+        {"ContentVersionId": "068B", "BuildingAddress": "1 High Street"},
+    ]
+
+    body = json.loads(asset_categorisation.process(event, None)["body"])
+
+    assert create.call_count == 1
+    assert [r["What_Is_It__c"] for r in body] == ["Sounder", "Beacon"]
+    assert body[1]["Asset_Condition__c"] == "C2 - Minor Defects Only"
+
+
+def test_batched_reply_with_wrong_count_falls_back_to_single_requests(asset_categorisation, mocker):
+    mocker.patch.object(asset_categorisation, "find_key_by_prefix", side_effect=lambda prefix: f"{prefix}/photo.jpg")
+    mocker.patch.object(asset_categorisation, "image_data_url", side_effect=lambda key: f"data:{key}")
+    create = mocker.patch.object(
+        asset_categorisation.get_openai_client().chat.completions,
+        "create",
+        new_callable=mocker.AsyncMock,
+        side_effect=[
+            _completion({"results": [{"What_Is_It__c": "Sounder"}]}),
+            _completion({"What_Is_It__c": "Sounder"}),
+            _completion({"What_Is_It__c": "Beacon"}),
+        ],
+    )
+    event = [
+        {"ContentVersionId": "068A", "BuildingAddress": "1 High Street"},
+        {"ContentVersionId": "068B", "BuildingAddress": "1 High Street"},
+    ]
+
+    body = json.loads(asset_categorisation.process(event, None)["body"])
+
+    assert create.call_count == 3
+    assert [r["What_Is_It__c"] for r in body] == ["Sounder", "Beacon"]
+
+
+def test_asset_schema_is_strict_and_enforces_picklists(asset_categorisation):
+    schema = asset_categorisation.ASSET_SCHEMA
+
+    assert set(schema["required"]) == set(schema["properties"]) == set(asset_categorisation.RESULT_DEFAULTS)
+    assert schema["properties"]["Confidence__c"] == {"type": "number"}
+    assert "Smoke Vent" in schema["properties"]["Object_Type_AI__c"]["enum"]
+    assert "Ground Floor" in schema["properties"]["Object_Category_AI__c"]["enum"]
+    assert schema["properties"]["Asset_Condition__c"]["enum"] == asset_categorisation.ASSET_CONDITION_VALUES
+
+
+def test_category_outside_the_chosen_object_type_is_dropped(asset_categorisation):
+    valid = asset_categorisation.finalise_fields({"Object_Type_AI__c": "Key Safe", "Object_Category_AI__c": "Combination"})
+    invalid = asset_categorisation.finalise_fields({"Object_Type_AI__c": "Key Safe", "Object_Category_AI__c": "Ground Floor"})
+
+    assert valid["Object_Category_AI__c"] == "Combination"
+    assert invalid["Object_Category_AI__c"] == "N/A"
+    with pytest.raises(TypeError):
+        asset_categorisation.OBJECT_MAP["Key Safe"] = ()
+
+
+@mock_aws
+def test_repeat_photo_is_served_from_the_result_cache(asset_categorisation, mocker):
+    s3 = boto3.client("s3")
+    s3.create_bucket(Bucket=asset_categorisation.S3_BUCKET)
+    s3.put_object(Bucket=asset_categorisation.S3_BUCKET, Key="068R/photo.jpg", Body=b"photo")
+    table = boto3.resource("dynamodb").create_table(
+        TableName="asset_categorisation_cache",
+        KeySchema=[{"AttributeName": "cacheKey", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "cacheKey", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    mocker.patch.object(asset_categorisation, "RESULT_CACHE_TABLE", table.name)
+    mocker.patch.object(asset_categorisation, "_dynamodb", None)
+    mocker.patch.object(asset_categorisation, "image_data_url", side_effect=lambda key: f"data:{key}")
+    create = mocker.patch.object(
+        asset_categorisation.get_openai_client().chat.completions,
+        "create",
+        new_callable=mocker.AsyncMock,
+        return_value=_completion({"What_Is_It__c": "Sounder", "Confidence__c": 0.9}),
+    )
+    event = [{"ContentVersionId": "068R", "BuildingAddress": "1 High Street"}]
+
+    first = json.loads(asset_categorisation.process(event, None)["body"])
+    asset_categorisation._result_cache.clear()  # force the DynamoDB layer
+    second = json.loads(asset_categorisation.process(event, None)["body"])
+
+    assert create.call_count == 1
+    assert first == second
+    assert second[0]["What_Is_It__c"] == "Sounder"
+
+
+@mock_aws
+def test_undecodable_photo_is_reported_as_an_item_error(asset_categorisation):
+    s3 = boto3.client("s3")
+    s3.create_bucket(Bucket=asset_categorisation.S3_BUCKET)
+    s3.put_object(Bucket=asset_categorisation.S3_BUCKET, Key="068H/photo.heic", Body=b"not an image")
+
+    body = json.loads(asset_categorisation.process([{"ContentVersionId": "068H"}], None)["body"])
+
+    assert body[0]["_error"].startswith("Inference failed: Unsupported image '068H/photo.heic'")
+
+
+def test_failed_group_does_not_cancel_its_siblings(asset_categorisation, mocker):
+    mocker.patch.object(asset_categorisation, "find_key_by_prefix", side_effect=lambda prefix: f"{prefix}/photo.jpg")
+    mocker.patch.object(asset_categorisation, "image_data_url", side_effect=lambda key: f"data:{key}")
+    real_classify_group = asset_categorisation.classify_group
+
+    async def classify_group(group, aws_request_id):
+        if group[0]["index"] == 0:
+            raise RuntimeError("boom")
+        await real_classify_group(group, aws_request_id)
+
+    mocker.patch.object(asset_categorisation, "classify_group", side_effect=classify_group)
+    mocker.patch.object(
+        asset_categorisation.get_openai_client().chat.completions,
+        "create",
+        new_callable=mocker.AsyncMock,
+        return_value=_completion({"What_Is_It__c": "Sounder"}),
+    )
+
+    body = json.loads(asset_categorisation.process([{"ContentVersionId": "068A"}, {"ContentVersionId": "068B"}], None)["body"])
+
+    assert body[0]["_error"] == "Inference failed: boom"
+    assert body[1]["What_Is_It__c"] == "Sounder"
+
+
+@mock_aws
+def test_repeated_prefix_is_listed_once(asset_categorisation, mocker):
+    s3 = boto3.client("s3")
+    s3.create_bucket(Bucket=asset_categorisation.S3_BUCKET)
+    s3.put_object(Bucket=asset_categorisation.S3_BUCKET, Key="068D/photo.jpg", Body=b"photo")
+    list_objects = mocker.spy(asset_categorisation.s3, "list_objects_v2")
+    mocker.patch.object(asset_categorisation, "image_data_url", side_effect=lambda key: f"data:{key}")
+    mocker.patch.object(
+        asset_categorisation.get_openai_client().chat.completions,
+        "create",
+        new_callable=mocker.AsyncMock,
+        return_value=_completion({"What_Is_It__c": "Sounder"}),
+    )
+
+    asset_categorisation.process(
+        [{"ContentVersionId": "068D", "BuildingAddress": "1 High Street"}, {"ContentVersionId": "068D"}], None
+    )
+
+    assert list_objects.call_count == 1
+
+
+@mock_aws
+def test_missing_cached_key_is_evicted(asset_categorisation):
+    s3 = boto3.client("s3")
+    s3.create_bucket(Bucket=asset_categorisation.S3_BUCKET)
+    s3.put_object(Bucket=asset_categorisation.S3_BUCKET, Key="068Z/photo.jpg", Body=b"a")
+    assert asset_categorisation.find_key_by_prefix("068Z") == "068Z/photo.jpg"
+    s3.delete_object(Bucket=asset_categorisation.S3_BUCKET, Key="068Z/photo.jpg")
+
+    prepared = asset_categorisation.prepare_item(0, {"ContentVersionId": "068Z"}, None)
+
+    assert "NoSuchKey" in prepared["result"]["_error"]
+    assert "068Z" not in asset_categorisation._key_cache
+
+
+@mock_aws
+def test_batch_mode_submits_and_collects_in_request_order(asset_categorisation, mocker):
+    s3 = boto3.client("s3")
+    s3.create_bucket(Bucket=asset_categorisation.S3_BUCKET)
+    s3.put_object(Bucket=asset_categorisation.S3_BUCKET, Key="068B1/photo.jpg", Body=b"a")
+    mocker.patch.object(asset_categorisation, "image_data_url", side_effect=lambda key: f"data:{key}")
+    client = asset_categorisation.get_openai_client()
+    files_create = mocker.patch.object(
+        client.files, "create", new_callable=mocker.AsyncMock, return_value=SimpleNamespace(id="file_in")
+    )
+    mocker.patch.object(
+        client.batches, "create", new_callable=mocker.AsyncMock, return_value=SimpleNamespace(id="batch_1")
+    )
+    items = [{"ContentVersionId": "068B1", "BuildingAddress": "1 High Street"}, {"ContentVersionId": "068NONE"}]
+
+    submitted = asset_categorisation.process({"mode": "batch", "items": items}, None)
+
+    assert submitted["statusCode"] == 202
+    assert json.loads(submitted["body"]) == {"status": "submitted", "batchId": "batch_1"}
+    lines = files_create.call_args.kwargs["file"][1].splitlines()
+    assert [json.loads(line)["custom_id"] for line in lines] == ["0"]
+    manifest = s3.get_object(
+        Bucket=asset_categorisation.S3_BUCKET, Key=f"{asset_categorisation.BATCH_RESULTS_PREFIX}batch_1/items.json"
+    )
+    assert not any("started" in item for item in json.loads(manifest["Body"].read()))
+
+    mocker.patch.object(
+        client.batches,
+        "retrieve",
+        new_callable=mocker.AsyncMock,
+        return_value=SimpleNamespace(status="completed", output_file_id="file_out"),
+    )
+    output = {
+        "custom_id": "0",
+        "response": {"body": {"choices": [{"message": {"content": json.dumps({"Object_Type_AI__c": "Sounder"})}}]}},
+    }
+    mocker.patch.object(
+        client.files,
+        "content",
+        new_callable=mocker.AsyncMock,
+        return_value=SimpleNamespace(content=json.dumps(output).encode()),
+    )
+
+    collected = asset_categorisation.process({"mode": "batch_status", "batchId": "batch_1"}, None)
+
+    results = json.loads(collected["body"])["results"]
+    assert results[0]["Object_Type_AI__c"] == "Sounder"
+    assert "_error" not in results[0]
+    assert "No S3 object" in results[1]["_error"]
+
+
+def test_first_wave_of_requests_is_staggered(asset_categorisation, mocker):
+    mocker.patch.object(asset_categorisation, "DISPATCH_STAGGER_SECONDS", 0.01)
+    started = []
+
+    async def fake_classify_group(group, aws_request_id):
+        started.append((group[0]["index"], asyncio.get_running_loop().time()))
+
+    mocker.patch.object(asset_categorisation, "classify_group", side_effect=fake_classify_group)
+    groups = [[{"index": i}] for i in range(3)]
+
+    asset_categorisation.event_loop.run_until_complete(asset_categorisation.classify_groups(groups, None))
+
+    assert [index for index, _ in started] == [0, 1, 2]
+    assert started[2][1] - started[0][1] >= 0.02
+
+
+def test_repeated_items_are_classified_once(asset_categorisation, mocker):
+    mocker.patch.object(asset_categorisation, "find_key_by_prefix", side_effect=lambda prefix: f"{prefix}/photo.jpg")
+    mocker.patch.object(asset_categorisation, "image_data_url", side_effect=lambda key: f"data:{key}")
+    call_openai = mocker.patch.object(
+        asset_categorisation, "call_openai", new_callable=mocker.AsyncMock, return_value={"What_Is_It__c": "Sounder"}
+    )
+    item = {"ContentVersionId": "068DUP1", "BuildingAddress": "1 High Street"}
+    other = {"ContentVersionId": "068DUP2"}
+
+    response = asset_categorisation.process([item, other, dict(item)], None)
+
+    body = json.loads(response["body"])
+    assert len(body) == 3
+    assert body[0] == body[2]
+    assert call_openai.await_count == 2
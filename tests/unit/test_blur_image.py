@@ -0,0 +1,69 @@
+import io
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+from PIL import Image
+
+
+@pytest.fixture
+def blur_image(aws_credentials):
+    # import here as aws clients are set globally in the file.
+    from lambdas import blur_image
+
+    return blur_image
+
+
+def _checkerboard(size=(200, 100)):
+    img = Image.new("RGB", size, "white")
+    for x in range(0, size[0], 4):
+        for y in range(0, size[1], 4):
+            if (x + y) % 8 == 0:
+                img.paste((0, 0, 0), (x, y, x + 4, y + 4))
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return img, buffer.getvalue()
+
+
+def test_blur_regions_only_changes_the_detected_boxes(blur_image):
+    original, image_bytes = _checkerboard()
+    bboxes = [
+        {"Left": 0.0, "Top": 0.0, "Width": 0.2, "Height": 0.4},
+        {"Left": 0.7, "Top": 0.5, "Width": 0.3, "Height": 0.5},
+    ]
+
+    blurred_buffer, content_type = blur_image._blur_regions(image_bytes, bboxes)
+
+    assert content_type == "image/jpeg"
+    with Image.open(blurred_buffer) as blurred:
+        inside = blurred.crop((0, 0, 40, 40)).convert("L")
+        outside = blurred.crop((80, 0, 120, 40)).convert("L")
+        corner = blurred.crop((140, 50, 200, 100)).convert("L")
+        # A blurred checkerboard flattens to grey; untouched squares stay near black/white.
+        assert max(inside.getdata()) - min(inside.getdata()) < 60
+        assert max(corner.getdata()) - min(corner.getdata()) < 60
+        assert max(outside.getdata()) - min(outside.getdata()) > 150
+
+
+@mock_aws
+def test_process_uploads_blurred_copy(blur_image, mocker):
+    s3 = boto3.client("s3")
+    s3.create_bucket(Bucket="photos")
+    _, image_bytes = _checkerboard()
+    s3.put_object(Bucket="photos", Key="assets/068A_photo.png", Body=image_bytes)
+    mocker.patch.object(blur_image, "s3", s3)
+    mocker.patch.object(
+        blur_image, "_detect_faces", return_value=[{"Left": 0.0, "Top": 0.0, "Width": 0.2, "Height": 0.4}]
+    )
+    mocker.patch.object(blur_image, "_detect_number_plates", return_value=[])
+
+    response = blur_image.process({"bucket": "photos", "key": "assets/068A_photo.png"}, None)
+
+    body = json.loads(response["body"])
+    assert response["statusCode"] == 200
+    assert body["faces_blurred"] == 1
+    stored = s3.get_object(Bucket="photos", Key="assets/068A_photo_blurred.png")
+    assert stored["ContentType"] == "image/jpeg"
+    with Image.open(io.BytesIO(stored["Body"].read())) as img:
+        assert img.size == (200, 100)
@@ -0,0 +1,319 @@
+import io
+import json
+import threading
+import time
+
+import boto3
+import pytest
+from moto import mock_aws
+
+
+@pytest.fixture
+def categorisation(aws_credentials):
+    # import here as aws clients are set globally in the file.
+    from lambdas import categorisation
+
+    return categorisation
+
+
+def _bedrock_response(fields: dict):
+    fields = {"Object_Category__c": "", "Asset_Instructions__c": "", "Label__c": "", "Name": "", **fields}
+    body = {"content": [{"type": "tool_use", "name": "emit_asset", "input": fields}]}
+    return {"body": io.BytesIO(json.dumps(body).encode())}
+
+
+def test_static_prompt_is_sent_as_a_cached_prefix(categorisation, mocker):
+    invoke = mocker.patch.object(
+        categorisation.bedrock,
+        "invoke_model",
+        return_value=_bedrock_response({"Object_Type__c": "Sounder", "Name": "Ground Floor SO"}),
+    )
+
+    out = categorisation.classify_asset_text('Sounder - Location: "Ground Floor"\nTest: FF1')
+
+    payload = json.loads(invoke.call_args.kwargs["body"])
+    static, dynamic = payload["messages"][0]["content"]
+    assert static == {
+        "type": "text", "text": categorisation.STATIC_PROMPT + "Input: ", "cache_control": {"type": "ephemeral"}
+    }
+    assert dynamic == {"type": "text", "text": 'Sounder - Location: "Ground Floor"\nTest: FF1'}
+    assert payload["tool_choice"] == {"type": "tool", "name": "emit_asset"}
+    assert payload["tools"][0]["input_schema"]["required"] == categorisation.OUTPUT_FIELDS
+    assert "Sounder - Location" not in categorisation.STATIC_PROMPT
+    assert invoke.call_args.kwargs["performanceConfigLatency"] == categorisation.LATENCY_MODE
+    assert out["Object_Type__c"] == "Sounder"
+
+
+def test_samples_are_classified_concurrently_in_request_order(categorisation, mocker):
+    def fake_classify(text):
+        if "fail" in text:
+            raise ValueError("bad output")
+        return {"Object_Type__c": text}
+
+    mocker.patch.object(categorisation, "classify_asset_text", side_effect=fake_classify)
+    event = {"body": json.dumps([{"input": "Sounder 2nd floor"}, {"input": "fail"}, {"input": "Beacon"}])}
+
+    response = categorisation.process(event, None)
+
+    results = json.loads(response["body"])
+    assert [r.get("Object_Type__c") for r in results] == ["Sounder 2nd floor", None, "Beacon"]
+    assert results[0]["Floor__c"] == "2nd Floor"
+    assert results[1] == {"error": "bad output", "input": "fail"}
+
+
+def test_duplicate_inputs_are_classified_once(categorisation, mocker):
+    classify = mocker.patch.object(
+        categorisation, "classify_asset_text", side_effect=lambda text: {"Object_Type__c": text}
+    )
+    event = {"body": json.dumps([{"input": "Sounder"}, {"input": "Beacon"}, {"input": "Sounder"}])}
+
+    response = categorisation.process(event, None)
+
+    results = json.loads(response["body"])
+    assert [r["Object_Type__c"] for r in results] == ["Sounder", "Beacon", "Sounder"]
+    assert classify.call_count == 2
+
+
+def test_empty_and_oversized_inputs_skip_classification(categorisation, mocker):
+    classify = mocker.patch.object(categorisation, "classify_asset_text")
+    long_text = "x" * (categorisation.MAX_INPUT_CHARS + 1)
+    event = {"body": json.dumps([{"input": "   "}, {"input": None}, {"input": long_text}])}
+
+    response = categorisation.process(event, None)
+
+    results = json.loads(response["body"])
+    assert [r["error"] for r in results] == ["empty input", "empty input", "input too long"]
+    classify.assert_not_called()
+
+
+def test_non_string_input_becomes_an_error_entry(categorisation, mocker):
+    mocker.patch.object(categorisation, "classify_asset_text", return_value={"Name": "Roof SO"})
+    event = {"body": json.dumps([{"input": 12345}, {"input": "Sounder on roof"}])}
+
+    response = categorisation.process(event, None)
+
+    results = json.loads(response["body"])
+    assert response["statusCode"] == 200
+    assert results[0] == {"error": "input must be a string", "input": 12345}
+    assert results[1]["Name"] == "Roof SO"
+
+
+def test_repeat_text_is_served_from_cache(categorisation, mocker):
+    invoke = mocker.patch.object(
+        categorisation.bedrock,
+        "invoke_model",
+        side_effect=lambda **_: _bedrock_response({"Object_Type__c": "Beacon", "Name": "Roof BE"}),
+    )
+
+    first = categorisation.classify_asset_text("Beacon on the roof ")
+    first["Floor__c"] = "Roof"
+    second = categorisation.classify_asset_text("Beacon  on the\nroof")
+
+    assert invoke.call_count == 1
+    assert second["Object_Type__c"] == "Beacon"
+    assert "Floor__c" not in second
+
+
+def test_structured_input_is_parsed_without_bedrock(categorisation, mocker):
+    invoke = mocker.patch.object(categorisation.bedrock, "invoke_model")
+
+    out = categorisation.classify_asset_text(
+        "Call Point - Location: Ground floor lobby. Type: Side key. Test: Activate CP3."
+    )
+
+    invoke.assert_not_called()
+    assert out["Object_Type__c"] == "Call Point"
+    assert out["Object_Category__c"] == "Key (Side)"
+    assert out["Asset_Instructions__c"] == "Activate CP3"
+    assert out["Label__c"] == "CP3"
+    assert out["Name"] == "Ground floor lobby, CP, CP3"
+
+
+def test_completed_bsra_keeps_its_fixed_result_when_structured(categorisation, mocker):
+    invoke = mocker.patch.object(categorisation.bedrock, "invoke_model")
+
+    out = categorisation.classify_asset_text("BSRA - Location: Block A. Type: Full. Test: completed")
+
+    invoke.assert_not_called()
+    assert out["Object_Type__c"] == "BSRA"
+    assert out["Name"] == "BSRA"
+    assert out["Asset_Instructions__c"] == "BSRA completed"
+
+
+def test_inputs_with_special_rules_still_go_to_bedrock(categorisation):
+    assert categorisation.rule_classify("Sounder - Location: Roof. Type: Red. Test: Step 2: Press button") is None
+    assert categorisation.rule_classify("Widget - Location: Roof. Type: Red. Test: Press") is None
+    assert categorisation.rule_classify("2nd floor corridor emergency light round FK2") is None
+    assert categorisation.rule_classify("Extinguisher - Location: Roof. Type: CO2. Test: Inspect") is None
+    assert categorisation.rule_classify("Fire Alarm Panel - Location: Lobby. Type: Addressable. Test: Silence") is None
+
+
+def test_structured_label_is_taken_from_the_location_too(categorisation):
+    out = categorisation.rule_classify("Emergency Light - Location: Corridor by FK2. Type: Round. Test: Press button")
+
+    assert out["Label__c"] == "FK2"
+    assert out["Name"] == "Corridor by FK2, EL, FK2"
+
+
+def test_structured_label_ignores_floor_tokens_and_prefers_the_test(categorisation):
+    basement = "Emergency Light - Location: Basement B1 plant room. Type: Round. Test: Activate switch"
+    out = categorisation.rule_classify(basement)
+
+    assert out["Label__c"] == ""
+    assert out["Name"] == "Basement B1 plant room, EL"
+
+    both = "Emergency Light - Location: Corridor by FK2. Type: Round. Test: Activate FK3"
+    assert categorisation.rule_classify(both)["Label__c"] == "FK3"
+
+
+def test_unparseable_reply_is_retried_on_the_fallback_model(categorisation, mocker):
+    replies = iter([
+        {"body": io.BytesIO(json.dumps({"content": [{"type": "text", "text": "not json"}]}).encode())},
+        _bedrock_response({"Object_Type__c": "Sounder", "Name": "Roof SO"}),
+    ])
+    invoke = mocker.patch.object(categorisation.bedrock, "invoke_model", side_effect=lambda **_: next(replies))
+
+    out = categorisation._classify_with_bedrock("sounder on the roof", "small-model")
+
+    assert [call.kwargs["modelId"] for call in invoke.call_args_list] == [
+        "small-model",
+        categorisation.FALLBACK_MODEL_ID,
+    ]
+    assert out["Object_Type__c"] == "Sounder"
+
+
+def test_text_reply_in_code_fence_is_still_parsed(categorisation, mocker):
+    fields = {"Object_Type__c": "Sounder", "Object_Category__c": "", "Asset_Instructions__c": "", "Label__c": None, "Name": "Roof SO"}
+    text = f"Here you go:\n```json\n{json.dumps(fields)}\n```"
+    mocker.patch.object(
+        categorisation.bedrock,
+        "invoke_model",
+        return_value={"body": io.BytesIO(json.dumps({"content": [{"type": "text", "text": text}]}).encode())},
+    )
+
+    out = categorisation._classify_with_bedrock("sounder on a roof")
+
+    assert out["Object_Type__c"] == "Sounder"
+
+
+def test_concurrent_misses_for_the_same_text_call_bedrock_once(categorisation, mocker):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_classify(text):
+        started.set()
+        release.wait(timeout=5)
+        return {"Object_Type__c": "Sounder", "Name": text}
+
+    classify = mocker.patch.object(categorisation, "_classify_with_bedrock", side_effect=slow_classify)
+    results = {}
+    first = threading.Thread(target=lambda: results.setdefault("a", categorisation.classify_asset_text("lone sounder")))
+    second = threading.Thread(target=lambda: results.setdefault("b", categorisation.classify_asset_text("lone sounder ")))
+
+    first.start()
+    assert started.wait(timeout=5)
+    second.start()
+    time.sleep(0.05)  # let the second caller find the in-flight entry
+    release.set()
+    first.join()
+    second.join()
+
+    assert classify.call_count == 1
+    assert results["a"] == results["b"]
+    assert results["a"] is not results["b"]
+
+
+def test_reply_missing_required_fields_is_rejected(categorisation, mocker):
+    body = {"content": [{"type": "tool_use", "name": "emit_asset", "input": {"Object_Type__c": "Sounder", "Name": 3}}]}
+    mocker.patch.object(
+        categorisation.bedrock, "invoke_model", return_value={"body": io.BytesIO(json.dumps(body).encode())}
+    )
+
+    with pytest.raises(ValueError, match="Missing fields"):
+        categorisation._classify_with_bedrock("sounder in the plant room")
+
+
+@pytest.mark.parametrize(
+    "text, floor",
+    [
+        ("lower ground floor riser", "Ground Floor"),
+        ("roof plant, gf", "Roof"),
+        ("ground floor mezzanine store", "Grd Mezzanine"),
+        ("external wall b1", "External Wall"),
+        ("Basement 3 plant", "Basement 3"),
+        ("Level 4 lobby", "4th Floor"),
+        ("golf store", None),
+        ("B5 Mezzanine store", "B5 Mezzanine"),
+        ("basement mezzanine b2 riser", "Basement Mezzanine B2"),
+        ("lvl 3 corridor, 2nd floor", "3rd Floor"),
+        ("level 0 mezz 2nd mezzanine", None),
+        ("B7 Mezzanine store", None),
+    ],
+)
+def test_extract_floor(categorisation, text, floor):
+    assert categorisation.extract_floor(text) == floor
+
+
+def test_extract_floor_only_returns_picklist_values(categorisation):
+    values = set(categorisation.CANONICAL_FLOORS.values())
+    values |= set(categorisation.ORDINALS.values()) | set(categorisation.MEZZ_ORDINALS.values())
+    values |= {categorisation.extract_floor(f"B{n} Mezzanine") for n in range(1, 51)} - {None}
+    values |= {categorisation.extract_floor(f"Basement {n}") for n in range(1, 6)}
+
+    assert values <= categorisation.CANONICAL_FLOORS_SET
+
+
+@mock_aws
+def test_batch_backfill_round_trip(categorisation, mocker):
+    categorisation._s3.cache_clear()
+    boto3.client("s3", region_name="eu-west-2").create_bucket(
+        Bucket="batch-bucket", CreateBucketConfiguration={"LocationConstraint": "eu-west-2"}
+    )
+    mocker.patch.object(categorisation, "BATCH_BUCKET", "batch-bucket")
+    mocker.patch.object(categorisation, "BATCH_MIN_RECORDS", 2)
+    jobs = mocker.patch.object(categorisation, "_bedrock_jobs").return_value
+    jobs.create_model_invocation_job.return_value = {"jobArn": "arn:aws:bedrock:eu-west-2:1:model-invocation-job/job1"}
+    items = [{"input": "batch sounder 2nd floor"}, {"input": ""}, {"input": "batch beacon"}]
+
+    submitted = categorisation.process({"body": json.dumps({"mode": "batch", "items": items})}, None)
+
+    assert submitted["statusCode"] == 202
+    job_name = jobs.create_model_invocation_job.call_args.kwargs["jobName"]
+    base = f"{categorisation.BATCH_PREFIX}{job_name}/"
+    s3 = categorisation._s3()
+    records = [json.loads(line) for line in s3.get_object(Bucket="batch-bucket", Key=f"{base}input.jsonl")["Body"].read().splitlines()]
+    assert [r["recordId"] for r in records] == ["0", "2"]
+    assert records[0]["modelInput"]["messages"][0]["content"][1]["text"] == "batch sounder 2nd floor"
+
+    jobs.get_model_invocation_job.return_value = {"status": "Completed", "jobName": job_name}
+    output = [
+        {"recordId": "0", "modelOutput": json.loads(_bedrock_response({"Object_Type__c": "Sounder"})["body"].read())},
+        {"recordId": "2", "error": {"errorMessage": "throttled"}},
+    ]
+    s3.put_object(
+        Bucket="batch-bucket",
+        Key=f"{base}output/job1/input.jsonl.out",
+        Body="\n".join(json.dumps(o) for o in output),
+    )
+
+    collected = categorisation.process(
+        {"body": json.dumps({"mode": "batch_status", "jobArn": "arn:aws:bedrock:eu-west-2:1:model-invocation-job/job1"})},
+        None,
+    )
+
+    body = json.loads(collected["body"])
+    assert body["status"] == "ok"
+    assert body["results"][0]["Object_Type__c"] == "Sounder"
+    assert body["results"][0]["Floor__c"] == "2nd Floor"
+    assert body["results"][1] == {"error": "empty input", "input": ""}
+    assert body["results"][2]["error"].startswith("Inference failed")
+
+
+def test_small_batch_is_classified_inline(categorisation, mocker):
+    jobs = mocker.patch.object(categorisation, "_bedrock_jobs")
+    mocker.patch.object(categorisation, "classify_asset_text", side_effect=lambda text: {"Object_Type__c": text})
+
+    response = categorisation.process({"body": json.dumps({"mode": "batch", "items": [{"input": "Sounder"}]})}, None)
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {"status": "ok", "results": [{"Object_Type__c": "Sounder", "Floor__c": None}]}
+    jobs.assert_not_called()
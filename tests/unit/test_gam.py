@@ -0,0 +1,354 @@
+import base64
+import io
+import json
+from types import SimpleNamespace
+
+import boto3
+import pytest
+from moto import mock_aws
+from PIL import Image
+
+
+@pytest.fixture
+def gam(aws_credentials, monkeypatch):
+    # import here as the OpenAI client is built from env at module load.
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.delenv("OPENAI_SECRET_ARN", raising=False)
+    from lambdas import gam
+
+    return gam
+
+
+def _completion(body: dict):
+    message = SimpleNamespace(content=json.dumps(body))
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class _Stream:
+    def __init__(self, *pieces: str):
+        self.chunks = [
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+            for piece in pieces
+        ]
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def close(self):
+        self.closed = True
+
+
+def test_batch_request_returns_results_in_asset_order(gam, mocker):
+    create = mocker.patch.object(
+        gam.get_async_openai_client().chat.completions,
+        "create",
+        new_callable=mocker.AsyncMock,
+        return_value=_completion(
+            {
+                "results": [
+                    {"What_Is_It__c": "Smoke detector", "Confidence__c": 0.8},
+                    {"What_Is_It__c": "Fire extinguisher", "Confidence__c": 2},
+                ]
+            }
+        ),
+    )
+    event = {
+        "body": json.dumps(
+            {
+                "assets": [
+                    {"id": "a1", "name": "Detector", "images": []},
+                    {"id": "a2", "name": "Extinguisher", "planStudioId": "p2"},
+                ]
+            }
+        )
+    }
+
+    response = gam.process(event, None)
+
+    assert response["statusCode"] == 200
+    assert create.call_count == 1
+    body = json.loads(response["body"])
+    assert [r["assetId"] for r in body["results"]] == ["a1", "a2"]
+    assert body["results"][1]["planStudioId"] == "p2"
+    assert body["results"][0]["fields"]["Name"] == "Detector"
+    assert body["results"][1]["fields"]["Confidence__c"] == 1.0
+
+
+def test_batch_request_rejects_mismatched_result_count(gam, mocker):
+    mocker.patch.object(
+        gam.get_async_openai_client().chat.completions,
+        "create",
+        new_callable=mocker.AsyncMock,
+        return_value=_completion({"results": [{}]}),
+    )
+    event = {"assets": [{"id": "a1"}, {"id": "a2"}]}
+
+    response = gam.process(event, None)
+
+    assert response["statusCode"] == 400
+    assert "one result per asset" in json.loads(response["body"])["message"]
+
+
+def test_batches_over_the_limit_are_sent_concurrently(gam, mocker):
+    mocker.patch.object(gam, "MAX_BATCH_ASSETS", 2)
+    create = mocker.patch.object(
+        gam.get_async_openai_client().chat.completions,
+        "create",
+        new_callable=mocker.AsyncMock,
+        return_value=_completion({"results": [{}, {}]}),
+    )
+    assets = [{"id": f"a{i}"} for i in range(4)]
+
+    response = gam.process({"assets": assets}, None)
+
+    assert response["statusCode"] == 200
+    assert create.await_count == 2
+    body = json.loads(response["body"])
+    assert [r["assetId"] for r in body["results"]] == ["a0", "a1", "a2", "a3"]
+
+
+@mock_aws
+def test_successful_batches_are_cached_when_a_sibling_fails(gam, mocker):
+    table = boto3.resource("dynamodb").create_table(
+        TableName="gam_cache",
+        KeySchema=[{"AttributeName": "cacheKey", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "cacheKey", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    mocker.patch.object(gam, "CACHE_TABLE", table.name)
+    mocker.patch.object(gam, "_dynamodb", None)
+    mocker.patch.object(gam, "MAX_BATCH_ASSETS", 1)
+
+    async def reply(**kwargs):
+        if "Xyzzy Panel" in json.dumps(kwargs["messages"][-1]["content"]):
+            raise ValueError("upstream failure")
+        return _completion({"results": [{"What_Is_It__c": "Sounder"}]})
+
+    create = mocker.patch.object(
+        gam.get_async_openai_client().chat.completions, "create", new_callable=mocker.AsyncMock, side_effect=reply
+    )
+    assets = [{"id": "a1", "name": "Xyzzy Panel"}, {"id": "a2", "name": "Sounder"}]
+
+    response = gam.process({"assets": assets}, None)
+
+    assert response["statusCode"] != 200
+    assert create.await_count == 2
+    assert table.scan()["Count"] == 1
+    assert gam._cache_get(assets[1])["What_Is_It__c"] == "Sounder"
+
+
+def test_missing_asset_id_is_bad_request(gam):
+    response = gam.process({"asset": {"name": "No id"}}, None)
+
+    assert response["statusCode"] == 400
+
+
+def test_output_fields_list_only_model_filled_fields(gam):
+    fields = json.loads(gam.OUTPUT_FIELDS_PART["text"].removeprefix("OUTPUT_FIELDS: "))
+
+    assert list(fields) == list(gam.ASSET_SCHEMA["properties"])
+    assert not gam.LAMBDA_OWNED_FIELDS & fields.keys()
+
+
+@mock_aws
+def test_completed_batch_results_are_mapped_back_to_assets(gam, mocker):
+    boto3.client("s3").create_bucket(Bucket=gam.ASSET_BUCKET)
+    gam.s3.put_object(
+        Bucket=gam.ASSET_BUCKET,
+        Key=f"{gam.BATCH_RESULTS_PREFIX}batch_1/assets.json",
+        Body=json.dumps([{"id": "a1", "name": "Detector"}, {"id": "a2"}]),
+    )
+    mocker.patch.object(
+        gam.get_openai_client().batches,
+        "retrieve",
+        return_value=SimpleNamespace(status="completed", output_file_id="file_1"),
+    )
+    output = {
+        "custom_id": "0",
+        "response": {
+            "body": {
+                "choices": [
+                    {"message": {"content": json.dumps({"results": [{}, {"What_Is_It__c": "Alarm"}]})}}
+                ]
+            }
+        },
+    }
+    mocker.patch.object(
+        gam.get_openai_client().files,
+        "content",
+        return_value=SimpleNamespace(content=json.dumps(output).encode()),
+    )
+
+    response = gam.process({"mode": "batch_status", "batchId": "batch_1"}, None)
+
+    body = json.loads(response["body"])
+    assert body["status"] == "ok"
+    assert body["results"][0]["fields"]["Name"] == "Detector"
+    assert body["results"][1]["fields"]["What_Is_It__c"] == "Alarm"
+    stored = gam.s3.get_object(Bucket=gam.ASSET_BUCKET, Key=body["resultsKey"])
+    assert json.loads(stored["Body"].read()) == body["results"]
+
+
+@mock_aws
+def test_expired_batch_returns_partial_output_and_request_errors(gam, mocker):
+    mocker.patch.object(gam, "MAX_BATCH_ASSETS", 1)
+    boto3.client("s3").create_bucket(Bucket=gam.ASSET_BUCKET)
+    gam.s3.put_object(
+        Bucket=gam.ASSET_BUCKET,
+        Key=f"{gam.BATCH_RESULTS_PREFIX}batch_2/assets.json",
+        Body=json.dumps([{"id": "a1"}, {"id": "a2"}, {"id": "a3"}]),
+    )
+    mocker.patch.object(
+        gam.get_openai_client().batches,
+        "retrieve",
+        return_value=SimpleNamespace(status="expired", output_file_id="out_1", error_file_id="err_1"),
+    )
+    files = {
+        "out_1": {
+            "custom_id": "0",
+            "response": {
+                "body": {"choices": [{"message": {"content": json.dumps({"results": [{"What_Is_It__c": "Alarm"}]})}}]}
+            },
+        },
+        "err_1": {
+            "custom_id": "1",
+            "response": {"status_code": 400, "body": {"error": {"message": "Invalid image"}}},
+        },
+    }
+    mocker.patch.object(
+        gam.get_openai_client().files,
+        "content",
+        side_effect=lambda file_id: SimpleNamespace(content=json.dumps(files[file_id]).encode()),
+    )
+
+    response = gam.process({"mode": "batch_status", "batchId": "batch_2"}, None)
+
+    body = json.loads(response["body"])
+    assert body["status"] == "expired"
+    assert body["results"][0]["fields"]["What_Is_It__c"] == "Alarm"
+    assert body["results"][1]["error"] == "Invalid image"
+    assert body["results"][2]["error"] == "Batch expired"
+
+
+@mock_aws
+def test_image_data_url_inlines_undecodable_bytes_unchanged(gam):
+    boto3.client("s3").create_bucket(Bucket=gam.ASSET_BUCKET)
+    image_bytes = bytes(range(256)) * 700
+    gam.s3.put_object(
+        Bucket=gam.ASSET_BUCKET, Key="068ABC/photo.png", Body=image_bytes, ContentType="image/png"
+    )
+
+    data_url = gam._image_data_url({"contentVersionId": "068ABC"})
+
+    assert data_url == "data:image/png;base64," + base64.b64encode(image_bytes).decode()
+
+
+@mock_aws
+def test_image_data_url_downscales_large_photos(gam):
+    boto3.client("s3").create_bucket(Bucket=gam.ASSET_BUCKET)
+    buffer = io.BytesIO()
+    Image.new("RGB", (4000, 3000), "red").save(buffer, format="PNG")
+    gam.s3.put_object(Bucket=gam.ASSET_BUCKET, Key="068BIG/photo.png", Body=buffer.getvalue(), ContentType="image/png")
+
+    data_url = gam._image_data_url({"contentVersionId": "068BIG"})
+
+    prefix, encoded = data_url.split(",", 1)
+    assert prefix == "data:image/jpeg;base64"
+    with Image.open(io.BytesIO(base64.b64decode(encoded))) as img:
+        assert img.size == (1024, 768)
+
+
+@mock_aws
+def test_repeat_asset_is_served_from_cache(gam, mocker):
+    table = boto3.resource("dynamodb").create_table(
+        TableName="gam_cache",
+        KeySchema=[{"AttributeName": "cacheKey", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "cacheKey", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    mocker.patch.object(gam, "CACHE_TABLE", table.name)
+    mocker.patch.object(gam, "_dynamodb", None)
+    create = mocker.patch.object(
+        gam.get_openai_client().chat.completions,
+        "create",
+        return_value=_Stream(json.dumps({"What_Is_It__c": "Sounder", "Confidence__c": 0.5})),
+    )
+    event = {"asset": {"id": "a1", "name": "Sounder"}}
+
+    first = gam.process(event, None)
+    second = gam.process(event, None)
+
+    assert create.call_count == 1
+    assert json.loads(first["body"]) == json.loads(second["body"])
+    assert json.loads(second["body"])["fields"]["What_Is_It__c"] == "Sounder"
+
+
+@mock_aws
+def test_empty_analysis_is_not_cached(gam, mocker):
+    table = boto3.resource("dynamodb").create_table(
+        TableName="gam_cache",
+        KeySchema=[{"AttributeName": "cacheKey", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "cacheKey", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    mocker.patch.object(gam, "CACHE_TABLE", table.name)
+    mocker.patch.object(gam, "_dynamodb", None)
+    create = mocker.patch.object(
+        gam.get_openai_client().chat.completions,
+        "create",
+        side_effect=lambda **_: _Stream(),  # e.g. a refusal: no content deltas
+    )
+    event = {"asset": {"id": "a1", "name": "Sounder"}}
+
+    gam.process(event, None)
+    gam.process(event, None)
+
+    assert create.call_count == 2
+    assert table.scan()["Count"] == 0
+
+
+def test_downscale_decodes_large_jpeg_at_reduced_size(gam):
+    buffer = io.BytesIO()
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90 degrees on display
+    Image.new("RGB", (4000, 3000), "blue").save(buffer, format="JPEG", exif=exif)
+
+    image_bytes, content_type = gam._downscale_for_vision(buffer.getvalue())
+
+    assert content_type == "image/jpeg"
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        assert img.size == (768, 1024)
+
+
+def test_json_stream_stops_at_the_closing_brace(gam):
+    stream = _Stream('{"a": "x}', '{", "b": {"c": 1}', "}\n", "ignored")
+
+    assert gam._read_json_stream(stream) == b'{"a": "x}{", "b": {"c": 1}}'
+    assert stream.closed
+
+
+def test_base64_proxy_body_is_parsed(gam):
+    body = base64.b64encode(json.dumps({"asset": {"id": "a1"}}).encode()).decode()
+
+    payload = gam._parse_event({"body": body, "isBase64Encoded": True})
+
+    assert payload == {"asset": {"id": "a1"}}
+
+
+def test_repeat_request_reuses_idempotency_key(gam, mocker):
+    create = mocker.patch.object(
+        gam.get_openai_client().chat.completions,
+        "create",
+        side_effect=lambda **_: _Stream("{}"),
+    )
+    event = {"asset": {"id": "a1", "name": "Sounder"}}
+
+    gam.process(event, None)
+    gam.process(event, None)
+    gam.process({"asset": {"id": "a2"}}, None)
+
+    keys = [call.kwargs["extra_headers"]["Idempotency-Key"] for call in create.call_args_list]
+    assert keys[0] == keys[1] != keys[2]
+    assert {call.kwargs["prompt_cache_key"] for call in create.call_args_list} == {gam.PROMPT_CACHE_KEY}
+    assert gam.get_openai_client().max_retries == gam.OPENAI_MAX_RETRIES
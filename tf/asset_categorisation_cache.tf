@@ -0,0 +1,52 @@
+# asset_categorisation_cache (DynamoDB) - asset photo results keyed by model, prompt, S3 ETag and address
+
+resource "aws_dynamodb_table" "asset_categorisation_cache" {
+  name         = "asset_categorisation_cache"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "cacheKey"
+
+  attribute {
+    name = "cacheKey"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  tags = {
+    Name        = "asset_categorisation_cache"
+    Environment = var.env
+  }
+}
+
+data "aws_iam_role" "asset_categorisation_role" {
+  name = "bedrock-lambda-asset_categorisation"
+}
+
+data "aws_iam_policy_document" "asset_categorisation_cache_policy" {
+  statement {
+    sid       = "DdbGetPutCache"
+    effect    = "Allow"
+    actions   = ["dynamodb:GetItem", "dynamodb:PutItem"]
+    resources = [aws_dynamodb_table.asset_categorisation_cache.arn]
+  }
+  # Batch API submissions keep their prepared items under this prefix until collected
+  statement {
+    sid       = "S3BatchManifests"
+    effect    = "Allow"
+    actions   = ["s3:GetObject", "s3:PutObject"]
+    resources = ["arn:aws:s3:::metrosafetyprod/asset_categorisation/batches/*"]
+  }
+}
+
+resource "aws_iam_policy" "asset_categorisation_cache_policy" {
+  name   = "asset-categorisation-cache-ddb"
+  policy = data.aws_iam_policy_document.asset_categorisation_cache_policy.json
+}
+
+resource "aws_iam_role_policy_attachment" "asset_categorisation_cache_attach" {
+  role       = data.aws_iam_role.asset_categorisation_role.name
+  policy_arn = aws_iam_policy.asset_categorisation_cache_policy.arn
+}
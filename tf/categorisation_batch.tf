@@ -0,0 +1,82 @@
+# categorisation batch inference - backfills are queued as Bedrock batch jobs.
+# Inputs, the request manifest and Bedrock's output live under categorisation/batches/
+# in the bedrock output bucket.
+
+locals {
+  categorisation_batch_objects = "${module.bedrock_output_bucket.this_s3_bucket_arn}/categorisation/batches/*"
+}
+
+# Service role Bedrock assumes to read the batch input and write its output
+data "aws_iam_policy_document" "categorisation_batch_assume" {
+  statement {
+    effect  = "Allow"
+    actions = ["sts:AssumeRole"]
+
+    principals {
+      type        = "Service"
+      identifiers = ["bedrock.amazonaws.com"]
+    }
+  }
+}
+
+resource "aws_iam_role" "categorisation_batch" {
+  name               = "categorisation-bedrock-batch"
+  assume_role_policy = data.aws_iam_policy_document.categorisation_batch_assume.json
+}
+
+data "aws_iam_policy_document" "categorisation_batch_s3" {
+  statement {
+    sid       = "S3BatchObjects"
+    effect    = "Allow"
+    actions   = ["s3:GetObject", "s3:PutObject"]
+    resources = [local.categorisation_batch_objects]
+  }
+  statement {
+    sid       = "S3BatchList"
+    effect    = "Allow"
+    actions   = ["s3:ListBucket"]
+    resources = [module.bedrock_output_bucket.this_s3_bucket_arn]
+  }
+}
+
+resource "aws_iam_role_policy" "categorisation_batch_s3" {
+  name   = "categorisation-batch-s3"
+  role   = aws_iam_role.categorisation_batch.id
+  policy = data.aws_iam_policy_document.categorisation_batch_s3.json
+}
+
+# Lambda side: submit/poll jobs, hand Bedrock the service role, read and write the batch files
+data "aws_iam_role" "categorisation_role" {
+  name = "bedrock-lambda-categorisation"
+}
+
+data "aws_iam_policy_document" "categorisation_batch_policy" {
+  statement {
+    sid       = "BedrockBatchJobs"
+    effect    = "Allow"
+    actions   = ["bedrock:CreateModelInvocationJob", "bedrock:GetModelInvocationJob"]
+    resources = ["*"]
+  }
+  statement {
+    sid       = "PassBatchRole"
+    effect    = "Allow"
+    actions   = ["iam:PassRole"]
+    resources = [aws_iam_role.categorisation_batch.arn]
+  }
+  statement {
+    sid       = "S3BatchObjects"
+    effect    = "Allow"
+    actions   = ["s3:GetObject", "s3:PutObject"]
+    resources = [local.categorisation_batch_objects]
+  }
+}
+
+resource "aws_iam_policy" "categorisation_batch_policy" {
+  name   = "categorisation-bedrock-batch"
+  policy = data.aws_iam_policy_document.categorisation_batch_policy.json
+}
+
+resource "aws_iam_role_policy_attachment" "categorisation_batch_attach" {
+  role       = data.aws_iam_role.categorisation_role.name
+  policy_arn = aws_iam_policy.categorisation_batch_policy.arn
+}
@@ -0,0 +1,52 @@
+# gam_cache (DynamoDB) - GAM results keyed by model, prompt and asset request
+
+resource "aws_dynamodb_table" "gam_cache" {
+  name         = "gam_cache"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "cacheKey"
+
+  attribute {
+    name = "cacheKey"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  tags = {
+    Name        = "gam_cache"
+    Environment = var.env
+  }
+}
+
+data "aws_iam_role" "gam_role" {
+  name = "bedrock-lambda-gam"
+}
+
+data "aws_iam_policy_document" "gam_cache_policy" {
+  statement {
+    sid       = "DdbGetPutCache"
+    effect    = "Allow"
+    actions   = ["dynamodb:GetItem", "dynamodb:PutItem"]
+    resources = [aws_dynamodb_table.gam_cache.arn]
+  }
+  # Batch API submissions keep their asset manifests and results under this prefix
+  statement {
+    sid       = "S3BatchManifests"
+    effect    = "Allow"
+    actions   = ["s3:GetObject", "s3:PutObject"]
+    resources = ["arn:aws:s3:::metrosafetyprod/gam/batches/*"]
+  }
+}
+
+resource "aws_iam_policy" "gam_cache_policy" {
+  name   = "gam-cache-ddb"
+  policy = data.aws_iam_policy_document.gam_cache_policy.json
+}
+
+resource "aws_iam_role_policy_attachment" "gam_cache_attach" {
+  role       = data.aws_iam_role.gam_role.name
+  policy_arn = aws_iam_policy.gam_cache_policy.arn
+}
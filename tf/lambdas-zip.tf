@@ -84,6 +84,7 @@ module "lambdas_zip" {
       timeout     = 240
       lambda_environment = {
         OPENAI_SECRET_ARN = aws_secretsmanager_secret.openai.arn
+        ASSET_CACHE_TABLE = aws_dynamodb_table.asset_categorisation_cache.name
       }
     }
 
@@ -135,6 +136,17 @@ module "lambdas_zip" {
       }
     }
 
+    categorisation = {
+      handler     = "process"
+      timeout     = 240
+      memory_size = 512
+
+      lambda_environment = {
+        CATEGORISATION_BATCH_BUCKET   = module.bedrock_output_bucket.this_s3_bucket_id
+        CATEGORISATION_BATCH_ROLE_ARN = aws_iam_role.categorisation_batch.arn
+      }
+    }
+
     archive_viewer = {
       handler     = "process"
       timeout     = 30
@@ -167,6 +179,7 @@ module "lambdas_zip" {
         OPENAI_SECRET_ARN     = aws_secretsmanager_secret.openai.arn
         ASSET_BUCKET          = "metrosafetyprod"
         GAM_MAX_IMAGES        = "4"
+        GAM_CACHE_TABLE       = aws_dynamodb_table.gam_cache.name
         PRESIGNED_URL_SECONDS = "900"
       }
     }
@@ -174,7 +187,6 @@ module "lambdas_zip" {
     # All other Lambdas
     basic_event            = { handler = "process", timeout = 240, memory_size = 512 }
     bedrock                = { handler = "process", timeout = 240, memory_size = 512 }
-    categorisation         = { handler = "process", timeout = 240, memory_size = 512 }
     checklist              = { handler = "process", timeout = 500, memory_size = 512 }
     checklist_proofing     = { handler = "process", timeout = 240, memory_size = 512 }
     config                 = { handler = "process", timeout = 240, memory_size = 512 }